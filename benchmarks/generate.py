@@ -0,0 +1,214 @@
+import argparse
+import csv
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+from src.importers import REQUIRED_COLUMNS_1C, REQUIRED_COLUMNS_SBIS
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+EMPLOYEES = [
+    ("Петров", "Пётр"),
+    ("Сидорова", "Анна"),
+    ("Кузнецов", "Олег"),
+    ("Смирнова", "Мария"),
+]
+OTHER_RESPONSIBLE = ["Иван Иванов", "Елена Волкова", "Администратор", ""]
+STOP_WORDS = ["тест", "возврат", "аванс", "бартер"]
+ORGANIZATIONS = ["ООО Ромашка", "ИП Лютиков", "АО Север"]
+
+NAME_ROOTS = [
+    "Альфа",
+    "Бета",
+    "Гарант",
+    "Техно",
+    "Строй",
+    "Сервис",
+    "Урал",
+    "Сибирь",
+    "Волга",
+    "Медиа",
+    "Логистик",
+    "Энерго",
+    "Агро",
+    "Инвест",
+    "Торг",
+    "Пром",
+]
+NAME_SUFFIXES = ["", "Плюс", "Групп", "Центр", "Сервис", "Трейд", "Мастер", "Про"]
+LEGAL_FORMS = ["ООО", "ИП", "АО", "ЗАО", "ПАО"]
+SURNAMES = ["Иванов", "Смирнов", "Попов", "Соколов", "Лебедев", "Новиков"]
+
+SBIS_OK = "Выполнение завершено успешно"
+SBIS_STATUSES = ["Ошибка доставки", "Отклонён", "Ожидает подписи"]
+SBIS_DOC_TYPES = ["Акт", "Акт", "Акт", "УПД", "ЭДОСч"]
+
+
+def contractor_names(rnd: random.Random, count: int) -> list:
+    names = []
+    for i in range(count):
+        form = rnd.choice(LEGAL_FORMS)
+        if form == "ИП":
+            base = (
+                f"{rnd.choice(SURNAMES)} {rnd.choice('АБВГДЕ')}.{rnd.choice('АБВГДЕ')}."
+            )
+        else:
+            base = f"{rnd.choice(NAME_ROOTS)}{rnd.choice(NAME_SUFFIXES)} {i}"
+        style = rnd.randrange(5)
+        if style == 0:
+            names.append(f"{form} «{base}»")
+        elif style == 1:
+            names.append(f"{base}, {form}")
+        elif style == 2:
+            names.append(f'{form} "{base}"')
+        elif style == 3:
+            names.append(f"{base} {form} (Склад {rnd.randint(1, 9)})")
+        else:
+            names.append(f"{form} {base}")
+    return names
+
+
+def generate_1c_rows(count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    contractors = contractor_names(rnd, max(10, count // 20))
+    start = datetime(2024, 1, 1)
+    previous = []
+    for i in range(count):
+        if previous and rnd.random() < 0.02:
+            row = list(rnd.choice(previous))
+            row[0] = i + 1
+            yield row
+            continue
+
+        surname, first_name = rnd.choice(EMPLOYEES)
+        responsible = (
+            f"{first_name} {surname}"
+            if rnd.random() < 0.7
+            else rnd.choice(OTHER_RESPONSIBLE)
+        )
+        comment_kind = rnd.random()
+        if comment_kind < 0.05:
+            comment = f"{rnd.choice(STOP_WORDS)} по договору"
+        elif comment_kind < 0.07:
+            comment = rnd.choice(["удалить", "заглушка"])
+        elif comment_kind < 0.12:
+            comment = f"для {rnd.choice(EMPLOYEES)[0].lower()}а"
+        elif comment_kind < 0.5:
+            comment = f"Оплата по счёту {rnd.randint(1, 9999)}"
+        else:
+            comment = ""
+        day = start + timedelta(days=rnd.randint(0, 730))
+        row = [
+            i + 1,
+            day.strftime("%d.%m.%Y") if rnd.random() < 0.5 else day,
+            f"ЦБ-{rnd.randint(1, count * 2):07d}",
+            0 if rnd.random() < 0.03 else round(rnd.uniform(100, 500_000), 2),
+            rnd.choice(contractors),
+            responsible,
+            comment,
+            rnd.choice(ORGANIZATIONS),
+        ]
+        if len(previous) < 1000:
+            previous.append(row)
+        yield row
+
+
+def generate_sbis_rows(count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    contractors = [
+        (name, f"{rnd.randint(10**9, 10**10 - 1)}/{rnd.randint(10**8, 10**9 - 1)}")
+        for name in contractor_names(rnd, max(10, count // 20))
+    ]
+    start = datetime(2024, 1, 1, 9)
+    previous = []
+    for i in range(count):
+        if previous and rnd.random() < 0.02:
+            yield list(rnd.choice(previous))
+            continue
+
+        name, inn_kpp = rnd.choice(contractors)
+        signed = start + timedelta(minutes=rnd.randint(0, 730 * 24 * 60))
+        package_type = "ДокОтгрИсх" if rnd.random() < 0.1 else "ДокОтгрВх"
+        amount = 0 if rnd.random() < 0.03 else round(rnd.uniform(100, 500_000), 2)
+        row = [
+            rnd.choice(SBIS_DOC_TYPES),
+            package_type,
+            SBIS_OK if rnd.random() < 0.9 else rnd.choice(SBIS_STATUSES),
+            amount,
+            signed.strftime("%d.%m.%Y %H:%M") if rnd.random() < 0.5 else signed,
+            f"{rnd.randint(1, count * 2)}",
+            name,
+            inn_kpp,
+            f"ON_NSCHFDOPPR_{i:08d}.xml",
+        ]
+        if len(previous) < 1000:
+            previous.append(row)
+        yield row
+
+
+GENERATORS = {
+    "1c": (REQUIRED_COLUMNS_1C, generate_1c_rows),
+    "sbis": (REQUIRED_COLUMNS_SBIS, generate_sbis_rows),
+}
+
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        if value.time() == datetime.min.time():
+            return value.strftime("%d.%m.%Y")
+        return value.strftime("%d.%m.%Y %H:%M")
+    if isinstance(value, float):
+        return f"{value:.2f}".replace(".", ",")
+    return value
+
+
+def write_xlsx(path, headers, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def write_csv(path, headers, rows):
+    with open(path, "w", encoding="cp1251", newline="") as fileobj:
+        writer = csv.writer(fileobj, delimiter=";")
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(map(csv_value, row))
+
+
+WRITERS = {"xlsx": write_xlsx, "csv": write_csv}
+
+
+def generate_file(path, kind: str, count: int, file_format: str, seed: int = 0):
+    headers, generate = GENERATORS[kind]
+    WRITERS[file_format](path, headers, generate(count, seed))
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate",
+        description="Генерация синтетических выгрузок 1С и СБИС",
+    )
+    parser.add_argument("kind", choices=list(GENERATORS))
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=parse_size, default=SIZES["10k"])
+    parser.add_argument("--format", choices=list(WRITERS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "xlsx")
+    generate_file(args.path, args.kind, args.rows, file_format, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+import argparse
+import sys
+import time
+from io import BytesIO
+
+from benchmarks.generate import generate_1c_rows, write_xlsx
+from src.importers import REQUIRED_COLUMNS_1C
+from src.readers import XLSX_READERS, open_xlsx_rows
+
+
+def generate_workbook(rows: int, seed: int = 0) -> bytes:
+    buffer = BytesIO()
+    write_xlsx(buffer, REQUIRED_COLUMNS_1C, generate_1c_rows(rows, seed))
+    return buffer.getvalue()
+
+
+def read_all(data: bytes, reader: str):
+    started = time.perf_counter()
+    with open_xlsx_rows(BytesIO(data), reader) as (headers, rows):
+        result = (tuple(headers), [tuple(row) for row in rows])
+    return result, time.perf_counter() - started
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as fileobj:
+        return fileobj.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Сравнение скорости и результата чтения XLSX разными библиотеками"
+    )
+    parser.add_argument(
+        "files", nargs="*", help="Файлы XLSX (по умолчанию генерируются)"
+    )
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    readers = [name for name, reader in XLSX_READERS.items() if reader.available()]
+    sources = [(path, read_file(path)) for path in args.files] or [
+        (f"сгенерировано строк: {args.rows}", generate_workbook(args.rows))
+    ]
+
+    identical = True
+    for name, data in sources:
+        print(name)
+        results = {}
+        for reader in readers:
+            results[reader], elapsed = read_all(data, reader)
+            rows = len(results[reader][1])
+            print(f"  {reader:10} {elapsed:8.3f} с  {rows / elapsed:10.0f} строк/с")
+        baseline = results[readers[0]]
+        for reader in readers[1:]:
+            if results[reader] != baseline:
+                identical = False
+                print(f"  {reader}: строки отличаются от {readers[0]}")
+
+    if len(readers) < 2:
+        print("Установлен только openpyxl, сравнивать не с чем")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.generate import EMPLOYEES, SIZES, STOP_WORDS, generate_file
+from src.database import Employee, StopWord, configure_sqlite_engine
+from src.importers import run_import
+from src.migrations import upgrade
+from src.readers import open_rows
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = ("10k",)
+KINDS = ("1c", "sbis")
+FORMATS = ("xlsx", "csv")
+DB_STATES = ("empty", "populated")
+TOLERANCE = 0.25
+
+
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, "peak_wset", memory.rss) / 1024 / 1024
+
+
+def scenario_name(kind: str, size: str, file_format: str, db_state: str) -> str:
+    return f"{kind}-{size}-{file_format}-{db_state}"
+
+
+def make_session_factory(db_path: str):
+    engine = configure_sqlite_engine(create_engine(f"sqlite:///{db_path}"))
+    upgrade(engine)
+    return sessionmaker(bind=engine)
+
+
+def seed_reference_data(session):
+    for last_name, first_name in EMPLOYEES:
+        session.add(Employee(last_name=last_name, first_name=first_name))
+    for word in STOP_WORDS:
+        session.add(StopWord(word=word))
+    session.commit()
+
+
+def import_file(session, kind: str, path: str) -> dict:
+    with open(path, "rb") as fileobj:
+        return run_import(session, kind, fileobj, filename=os.path.basename(path))
+
+
+def run_scenario(kind: str, path: str, populated_path, db_path: str) -> dict:
+    session = make_session_factory(db_path)()
+    seed_reference_data(session)
+    if populated_path:
+        import_file(session, kind, populated_path)
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    with open(path, "rb") as fileobj, open_rows(fileobj, path) as (_, rows):
+        rows_total = sum(1 for _ in rows)
+    read = {
+        "wall": time.perf_counter() - started,
+        "cpu": time.process_time() - cpu_started,
+    }
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    result = import_file(session, kind, path)
+    total = {
+        "wall": time.perf_counter() - started,
+        "cpu": time.process_time() - cpu_started,
+    }
+    session.close()
+
+    return {
+        "rows": rows_total,
+        "added": result.get("added"),
+        "stages": {"read": read, "import": total},
+        "import_stages": result.get("timings", {}).get("stages", {}),
+        "rows_per_second": rows_total / total["wall"] if total["wall"] else 0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(*args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_scenario, *args).result()
+
+
+def compare(name: str, measured: dict, baseline: dict, tolerance: float) -> list:
+    problems = []
+    min_speed = baseline["rows_per_second"] * (1 - tolerance)
+    if measured["rows_per_second"] < min_speed:
+        problems.append(
+            f"{name}: {measured['rows_per_second']:.0f} rows/s "
+            f"< {min_speed:.0f} (baseline {baseline['rows_per_second']:.0f})"
+        )
+    if measured["peak_rss_mb"] is None or baseline.get("peak_rss_mb") is None:
+        return problems
+    max_rss = baseline["peak_rss_mb"] * (1 + tolerance)
+    if measured["peak_rss_mb"] > max_rss:
+        problems.append(
+            f"{name}: peak RSS {measured['peak_rss_mb']:.0f} MB "
+            f"> {max_rss:.0f} MB (baseline {baseline['peak_rss_mb']:.0f} MB)"
+        )
+    return problems
+
+
+def load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as fileobj:
+        return json.load(fileobj)
+
+
+def save_baselines(path: str, baselines: dict):
+    with open(path, "w", encoding="utf-8") as fileobj:
+        json.dump(baselines, fileobj, ensure_ascii=False, indent=2, sort_keys=True)
+        fileobj.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Замер скорости импорта на синтетических выгрузках 1С и СБИС",
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", choices=list(SIZES), default=DEFAULT_SIZES
+    )
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=KINDS)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--db", nargs="+", choices=DB_STATES, default=DB_STATES)
+    parser.add_argument("--data-dir", help="Каталог для сгенерированных файлов")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help="Сохранить результаты как новые эталонные значения",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--json", help="Сохранить результаты в файл JSON")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    results = {}
+    problems = []
+    with tempfile.TemporaryDirectory(prefix="import-bench-") as workdir:
+        data_dir = args.data_dir or workdir
+        os.makedirs(data_dir, exist_ok=True)
+        for kind, size, file_format, db_state in product(
+            args.kinds, args.sizes, args.formats, args.db
+        ):
+            paths = []
+            for seed in (0, 1) if db_state == "populated" else (0,):
+                path = os.path.join(data_dir, f"{kind}_{size}_{seed}.{file_format}")
+                if not os.path.exists(path):
+                    generate_file(path, kind, SIZES[size], file_format, seed)
+                paths.append(path)
+
+            name = scenario_name(kind, size, file_format, db_state)
+            db_path = os.path.join(workdir, f"{name}.db")
+            populated_path = paths[1] if len(paths) > 1 else None
+            measured = run_isolated(kind, paths[0], populated_path, db_path)
+            results[name] = measured
+
+            stages = "  ".join(
+                f"{stage} {timing['wall']:.2f}s/{timing['cpu']:.2f}s cpu"
+                for stage, timing in measured["stages"].items()
+            )
+            rss = measured["peak_rss_mb"]
+            print(
+                f"{name:28} {measured['rows_per_second']:9.0f} rows/s  "
+                f"{f'{rss:6.0f} MB' if rss is not None else '     - MB'}  {stages}"
+            )
+            print(
+                " " * 29
+                + "  ".join(
+                    f"{stage} {timing['wall']:.2f}s"
+                    for stage, timing in measured["import_stages"].items()
+                )
+            )
+            if name in baselines and not args.update_baselines:
+                problems.extend(
+                    compare(name, measured, baselines[name], args.tolerance)
+                )
+
+    if args.json:
+        save_baselines(args.json, results)
+    if args.update_baselines:
+        for name, measured in results.items():
+            baseline = {"rows_per_second": round(measured["rows_per_second"])}
+            if measured["peak_rss_mb"] is not None:
+                baseline["peak_rss_mb"] = round(measured["peak_rss_mb"])
+            baselines[name] = baseline
+        save_baselines(args.baselines, baselines)
+        print(f"Эталонные значения сохранены в {args.baselines}")
+
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -71,7 +71,13 @@ def main():
     print("\n" + "-" * 50)
     print("Начинаю очистку базы данных...")
 
-    tables_to_clear = ["contractors", "invoices", "acts"]
+    tables_to_clear = [
+        "import_report_rows",
+        "contractors",
+        "invoices",
+        "acts",
+        "import_runs",
+    ]
     if not keep_employees:
         tables_to_clear.append("employees")
     if not keep_stop_words:
@@ -87,6 +93,14 @@ def main():
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
+        existing = {
+            row[0]
+            for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        tables_to_clear = [t for t in tables_to_clear if t in existing]
+
         for table in tables_to_clear:
             cursor.execute(f"DELETE FROM {table}")
             print(f"  - Таблица '{table}' очищена")
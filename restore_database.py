@@ -1,10 +1,22 @@
-import sqlite3
 import os
 import shutil
-from datetime import datetime
+
+from sqlalchemy import create_engine
+
+from src.counters import repair_counters
+from src.database import configure_sqlite_engine
+from src.migrations import upgrade
+from src.statuses import refresh_statuses
 
 DB_PATH = "database.db"
 BACKUP_DIR = "backups"
+RESTORED_TABLES = [
+    "import_runs",
+    "import_report_rows",
+    "contractors",
+    "invoices",
+    "acts",
+]
 
 
 def list_backups():
@@ -33,30 +45,80 @@ def get_table_choice(table_name):
         print("Введите 1, 2 или 3")
 
 
-def restore_table(cursor_main, cursor_backup, table, mode):
-    cursor_backup.execute(f"SELECT * FROM {table}")
-    backup_rows = cursor_backup.fetchall()
+def table_columns(conn, table):
+    return [info[1] for info in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
 
-    if not backup_rows:
-        print(f"  - Таблица '{table}' пуста в бекапе")
-        return
 
-    cursor_main.execute(f"PRAGMA table_info({table})")
-    columns = [info[1] for info in cursor_main.fetchall()]
-    placeholders = ",".join(["?"] * len(columns))
-    insert_sql = f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders})"
+def copy_table(conn_main, conn_backup, table):
+    backup_columns = set(table_columns(conn_backup, table))
+    columns = [c for c in table_columns(conn_main, table) if c in backup_columns]
+    if not columns:
+        return 0
+
+    names = ",".join(columns)
+    rows = conn_backup.exec_driver_sql(f"SELECT {names} FROM {table}").fetchall()
+    if rows:
+        placeholders = ",".join(["?"] * len(columns))
+        conn_main.exec_driver_sql(
+            f"INSERT INTO {table} ({names}) VALUES ({placeholders})",
+            [tuple(row) for row in rows],
+        )
+    return len(rows)
+
 
+def restore_table(conn_main, conn_backup, table, mode):
     if mode == 1:
         print(f"  - Таблица '{table}': не восстанавливается (оставлены текущие данные)")
+        return
+
+    if mode == 3:
+        conn_main.exec_driver_sql(f"DELETE FROM {table}")
+    count = copy_table(conn_main, conn_backup, table)
+
+    if not count:
+        print(f"  - Таблица '{table}' пуста в бекапе")
     elif mode == 2:
-        cursor_main.executemany(insert_sql, backup_rows)
-        print(f"  - Таблица '{table}': добавлено {len(backup_rows)} записей из бекапа")
-    elif mode == 3:
-        cursor_main.execute(f"DELETE FROM {table}")
-        cursor_main.executemany(insert_sql, backup_rows)
-        print(
-            f"  - Таблица '{table}': заменено на {len(backup_rows)} записей из бекапа"
-        )
+        print(f"  - Таблица '{table}': добавлено {count} записей из бекапа")
+    else:
+        print(f"  - Таблица '{table}': заменено на {count} записей из бекапа")
+
+
+def restore_backup(backup_path, db_path, employees_choice, stop_words_choice):
+    temp_path = db_path + ".temp"
+    shutil.copy2(backup_path, temp_path)
+    engine_main = configure_sqlite_engine(create_engine(f"sqlite:///{db_path}"))
+    engine_backup = create_engine(f"sqlite:///{temp_path}")
+
+    try:
+        upgrade(engine_backup)
+        upgrade(engine_main)
+        with engine_main.begin() as conn_main, engine_backup.connect() as conn_backup:
+            print(f"Восстановление таблиц {', '.join(RESTORED_TABLES)}...")
+            for table in RESTORED_TABLES:
+                conn_main.exec_driver_sql(f"DELETE FROM {table}")
+                print(f"  - Таблица '{table}' очищена")
+
+            for table in RESTORED_TABLES:
+                count = copy_table(conn_main, conn_backup, table)
+                if count:
+                    print(f"  - Таблица '{table}' восстановлена ({count} записей)")
+                else:
+                    print(f"  - Таблица '{table}' пуста в бекапе")
+
+            print("\n" + "-" * 60)
+            print("Восстановление таблиц employees и stop_words...")
+
+            restore_table(conn_main, conn_backup, "employees", employees_choice)
+            restore_table(conn_main, conn_backup, "stop_words", stop_words_choice)
+
+            print("\n" + "-" * 60)
+            print("Пересчёт счётчиков актов и статусов счетов...")
+            repair_counters(conn_main)
+            refresh_statuses(conn_main)
+    finally:
+        engine_main.dispose()
+        engine_backup.dispose()
+        os.remove(temp_path)
 
 
 def main():
@@ -110,58 +172,11 @@ def main():
     stop_words_choice = get_table_choice("stop_words (стоп-слова)")
     print("-" * 60)
 
-    print("Восстановление таблиц contractors, invoices, acts...")
-
     try:
-        conn_main = sqlite3.connect(DB_PATH)
-        cursor_main = conn_main.cursor()
-
-        for table in ["contractors", "invoices", "acts"]:
-            cursor_main.execute(f"DELETE FROM {table}")
-            print(f"  - Таблица '{table}' очищена")
-
-        conn_main.commit()
-        conn_main.close()
-
-        shutil.copy2(backup_path, DB_PATH + ".temp")
-
-        conn_temp = sqlite3.connect(DB_PATH + ".temp")
-        conn_main = sqlite3.connect(DB_PATH)
-        cursor_temp = conn_temp.cursor()
-        cursor_main = conn_main.cursor()
-
-        for table in ["contractors", "invoices", "acts"]:
-            cursor_temp.execute(f"SELECT * FROM {table}")
-            rows = cursor_temp.fetchall()
-
-            if rows:
-                cursor_main.execute(f"PRAGMA table_info({table})")
-                columns = [info[1] for info in cursor_main.fetchall()]
-                placeholders = ",".join(["?"] * len(columns))
-                insert_sql = (
-                    f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders})"
-                )
-                cursor_main.executemany(insert_sql, rows)
-                print(f"  - Таблица '{table}' восстановлена ({len(rows)} записей)")
-            else:
-                print(f"  - Таблица '{table}' пуста в бекапе")
-
-        print("\n" + "-" * 60)
-        print("Восстановление таблиц employees и stop_words...")
-
-        restore_table(cursor_main, cursor_temp, "employees", employees_choice)
-        restore_table(cursor_main, cursor_temp, "stop_words", stop_words_choice)
-
-        conn_temp.close()
-        conn_main.commit()
-        conn_main.close()
-
-        os.remove(DB_PATH + ".temp")
-
+        restore_backup(backup_path, DB_PATH, employees_choice, stop_words_choice)
     except Exception as e:
         print(f"ОШИБКА при восстановлении: {e}")
-        if os.path.exists(DB_PATH + ".temp"):
-            os.remove(DB_PATH + ".temp")
+        print("Данные в базе не изменены.")
         input("\nНажмите Enter для выхода...")
         return
 
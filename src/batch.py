@@ -0,0 +1,185 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Optional
+
+from .importers import IMPORTERS, detect_kind, import_rows
+from .readers import (
+    CSV_EXTENSIONS,
+    UPLOAD_CHUNK_SIZE,
+    load_spooled_rows,
+    spool_rows,
+)
+
+BATCH_EXTENSIONS = (".xlsx", *CSV_EXTENSIONS)
+PARSE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _stage_file(fileobj, filename: str, directory: str, index: int) -> dict:
+    extension = os.path.splitext(filename)[1].lower()
+    path = os.path.join(directory, f"{index}{extension}")
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        while chunk := fileobj.read(UPLOAD_CHUNK_SIZE):
+            out.write(chunk)
+            digest.update(chunk)
+    return {"filename": filename, "path": path, "file_hash": digest.hexdigest()}
+
+
+def _stage_archive(fileobj, filename: str, directory: str, staged: list):
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(BATCH_EXTENSIONS):
+                continue
+            with archive.open(info) as member:
+                staged.append(
+                    _stage_file(
+                        member,
+                        f"{filename}/{info.filename}",
+                        directory,
+                        len(staged),
+                    )
+                )
+
+
+def stage_sources(sources, directory: str) -> list:
+    staged = []
+    for filename, fileobj in sources:
+        try:
+            if (filename or "").lower().endswith(".zip"):
+                _stage_archive(fileobj, filename, directory, staged)
+            else:
+                staged.append(_stage_file(fileobj, filename, directory, len(staged)))
+        except (zipfile.BadZipFile, OSError) as e:
+            staged.append(
+                {"filename": filename, "error": f"Не удалось прочитать файл: {e}"}
+            )
+    return staged
+
+
+def _import_staged(
+    session_factory, item: dict, future, kind, progress, options
+) -> dict:
+    file_info = {"filename": item["filename"]}
+    if item.get("error"):
+        return {**file_info, "error": item["error"]}
+    try:
+        headers, spool_path, total = future.result()
+    except Exception as e:
+        return {**file_info, "error": f"Не удалось прочитать файл: {e}"}
+
+    kind = kind or detect_kind(headers)
+    if kind is None:
+        return {**file_info, "error": "Не удалось определить тип файла (1С или СБИС)"}
+
+    session = session_factory()
+    try:
+        result = import_rows(
+            session,
+            kind,
+            headers,
+            load_spooled_rows(spool_path),
+            filename=item["filename"],
+            file_hash=item["file_hash"],
+            progress=progress,
+            **options,
+        )
+    except Exception as e:
+        session.rollback()
+        result = {"error": str(e)}
+    finally:
+        session.close()
+        os.remove(spool_path)
+    return {**file_info, "kind": kind, "rows": total, **result}
+
+
+def combine_results(results: list) -> dict:
+    totals = {}
+    for result in results:
+        if result.get("error"):
+            continue
+        kind_totals = totals.setdefault(
+            result["kind"], dict.fromkeys(IMPORTERS[result["kind"]].counter_names, 0)
+        )
+        for name in kind_totals:
+            kind_totals[name] += result[name]
+    return {
+        "success": True,
+        "files_total": len(results),
+        "files_failed": sum(1 for result in results if result.get("error")),
+        "totals": totals,
+        "files": results,
+    }
+
+
+def run_batch(
+    session_factory,
+    sources,
+    progress=None,
+    kind: Optional[str] = None,
+    workers: Optional[int] = None,
+    **options,
+) -> dict:
+    results = []
+    rows_done = 0
+    with (
+        tempfile.TemporaryDirectory(prefix="import-batch-") as directory,
+        ExitStack() as stack,
+    ):
+        staged = iter(stage_sources(sources, directory))
+        if workers:
+            pool = stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            )
+        else:
+            pool = get_parse_pool()
+        pending = deque()
+
+        def submit_next():
+            item = next(staged, None)
+            if item and item.get("error"):
+                pending.append((item, None))
+            elif item:
+                pending.append((item, pool.submit(spool_rows, item["path"])))
+
+        for _ in range((workers or PARSE_WORKERS) + 1):
+            submit_next()
+
+        while pending:
+            item, future = pending.popleft()
+            submit_next()
+
+            def file_progress(rows_processed, counters, rows_done=rows_done):
+                if progress:
+                    progress(rows_done + rows_processed, counters)
+
+            result = _import_staged(
+                session_factory, item, future, kind, file_progress, options
+            )
+            rows_done += result.get("rows", 0)
+            results.append(result)
+
+    return combine_results(results)
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+from contextlib import ExitStack
+
+from .batch import combine_results, run_batch
+from .database import get_session_factory, init_db
+from .importers import IMPORT_CHUNK_SIZE, run_import
+from .profiling import configure_import_logging
+from .readers import hash_file
+
+COMMAND_KINDS = {"import-1c": "1c", "import-sbis": "sbis", "import": None}
+
+
+def import_file(session_factory, kind: str, path: str, options: dict) -> dict:
+    rows = {"total": 0}
+
+    def progress(rows_processed, counters):
+        rows["total"] = rows_processed
+
+    session = session_factory()
+    try:
+        with open(path, "rb") as fileobj:
+            result = run_import(
+                session,
+                kind,
+                fileobj,
+                filename=path,
+                file_hash=hash_file(path),
+                progress=progress,
+                **options,
+            )
+    except Exception as e:
+        session.rollback()
+        result = {"error": str(e)}
+    finally:
+        session.close()
+    return {"filename": path, "kind": kind, "rows": rows["total"], **result}
+
+
+def import_files(session_factory, kind, paths: list, jobs: int, **options) -> dict:
+    archives = any(path.lower().endswith(".zip") for path in paths)
+    if jobs > 1 or kind is None or archives:
+        with ExitStack() as stack:
+            sources = [(path, stack.enter_context(open(path, "rb"))) for path in paths]
+            return run_batch(
+                session_factory, sources, kind=kind, workers=jobs, **options
+            )
+    return combine_results(
+        [import_file(session_factory, kind, path, options) for path in paths]
+    )
+
+
+def print_summary(result: dict):
+    for file in result["files"]:
+        if file.get("error"):
+            print(f"{file['filename']}: ошибка: {file['error']}")
+            continue
+        added = "будет добавлено" if file.get("dry_run") else "добавлено"
+        print(
+            f"{file['filename']} ({file['kind']}, импорт #{file['run_id']}): "
+            f"строк {file['rows']}, {added} {file['added']}"
+        )
+    for kind, counters in result["totals"].items():
+        print(f"Итого {kind}: " + ", ".join(f"{k}={v}" for k, v in counters.items()))
+    print(f"Файлов: {result['files_total']}, с ошибками: {result['files_failed']}")
+
+
+def main(argv=None, session_factory=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Импорт файлов 1С и СБИС без веб-интерфейса",
+    )
+    parser.add_argument(
+        "command",
+        choices=list(COMMAND_KINDS),
+        help="import определяет тип каждого файла по заголовкам",
+    )
+    parser.add_argument("paths", nargs="+", help="Файлы XLSX, CSV или ZIP-архивы")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Число процессов для разбора файлов (запись в базу всегда одна)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument(
+        "--commit-per-chunk",
+        action="store_true",
+        help="Фиксировать каждый пакет строк, а не весь файл целиком",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Сохранить профиль cProfile каждого импорта в каталог profiles/",
+    )
+    parser.add_argument("--json", action="store_true", help="Итог в формате JSON")
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.paths if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"Файл не найден: {', '.join(missing)}")
+    if args.jobs < 1 or args.chunk_size < 1:
+        parser.error("--jobs и --chunk-size должны быть положительными")
+
+    configure_import_logging()
+    if session_factory is None:
+        init_db()
+        session_factory = get_session_factory()
+
+    result = import_files(
+        session_factory,
+        COMMAND_KINDS[args.command],
+        args.paths,
+        args.jobs,
+        chunk_size=args.chunk_size,
+        atomic=not args.commit_per_chunk,
+        dry_run=args.dry_run,
+        force=args.force,
+        profile=args.profile,
+    )
+
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2, default=str)
+        print()
+    else:
+        print_summary(result)
+    return 1 if result["files_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+import re
+from collections import Counter
+from datetime import datetime, date, timedelta
+from typing import Optional
+
+DATETIME_FORMATS = (
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%y %H:%M",
+    "%d.%m.%y %H:%M:%S",
+    "%H:%M %d.%m.%Y",
+    "%H:%M:%S %d.%m.%Y",
+    "%H:%M %d.%m.%y",
+    "%H:%M:%S %d.%m.%y",
+    "%d.%m.%Y",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+)
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+INFER_SAMPLE_ROWS = 20
+
+FORMAT_FIELDS = {
+    "%d": ("day", r"(\d\d)"),
+    "%m": ("month", r"(\d\d)"),
+    "%Y": ("year", r"(\d{4})"),
+    "%y": ("short_year", r"(\d\d)"),
+    "%H": ("hour", r"(\d\d)"),
+    "%M": ("minute", r"(\d\d)"),
+    "%S": ("second", r"(\d\d)"),
+}
+FORMAT_TOKEN_RE = re.compile(r"%[a-zA-Z]")
+
+AMOUNT_TRANSLATION = str.maketrans({" ": None, "\xa0": None, "\u202f": None, ",": "."})
+
+
+def parse_datetime_string(value: str):
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt), fmt
+        except ValueError:
+            continue
+    return None, None
+
+
+def parse_datetime(value) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    if isinstance(value, (int, float)):
+        try:
+            return EXCEL_EPOCH + timedelta(days=int(value))
+        except (ValueError, OverflowError):
+            return None
+    if isinstance(value, str):
+        return parse_datetime_string(value.strip())[0]
+    return None
+
+
+def parse_date(value) -> Optional[date]:
+    dt = parse_datetime(value)
+    return dt.date() if dt else None
+
+
+def parse_amount(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.translate(AMOUNT_TRANSLATION).strip())
+        except ValueError:
+            return None
+    return None
+
+
+class FastFormat:
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.fields = []
+        pattern = []
+        pos = 0
+        for token in FORMAT_TOKEN_RE.finditer(fmt):
+            name, regex = FORMAT_FIELDS[token.group()]
+            pattern.append(re.escape(fmt[pos : token.start()]))
+            pattern.append(regex)
+            self.fields.append(name)
+            pos = token.end()
+        pattern.append(re.escape(fmt[pos:]))
+        self.regex = re.compile("".join(pattern), re.ASCII)
+
+    def build(self, groups) -> datetime:
+        parts = dict(zip(self.fields, map(int, groups)))
+        if "short_year" in parts:
+            short_year = parts.pop("short_year")
+            parts["year"] = short_year + (2000 if short_year <= 68 else 1900)
+        return datetime(**parts)
+
+    def parse(self, value: str) -> Optional[datetime]:
+        match = self.regex.fullmatch(value)
+        try:
+            if match:
+                return self.build(match.groups())
+            return datetime.strptime(value, self.fmt)
+        except ValueError:
+            return None
+
+
+class DateTimeColumn:
+    def __init__(self, sample_size: int = INFER_SAMPLE_ROWS):
+        self.sample_size = sample_size
+        self.samples = Counter()
+        self.fast = None
+
+    def parse(self, value) -> Optional[datetime]:
+        if not isinstance(value, str) or not value:
+            return parse_datetime(value)
+        value = value.strip()
+        if self.fast:
+            dt = self.fast.parse(value)
+            if dt is not None:
+                return dt
+
+        dt, fmt = parse_datetime_string(value)
+        if fmt and not self.fast:
+            self.samples[fmt] += 1
+            if self.samples.total() >= self.sample_size:
+                self.fast = FastFormat(self.samples.most_common(1)[0][0])
+        return dt
+
+    def parse_date(self, value) -> Optional[date]:
+        dt = self.parse(value)
+        return dt.date() if dt else None
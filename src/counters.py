@@ -0,0 +1,100 @@
+from sqlalchemy import bindparam, func, select, update
+
+from .database import Act, Contractor, Invoice, init_db, session_scope
+from .statuses import invoice_status
+
+ACTS_COUNT = (
+    select(func.count(Act.id))
+    .where(Act.invoice_id == Invoice.id)
+    .correlate(Invoice)
+    .scalar_subquery()
+)
+ACTS_SUM = (
+    select(func.coalesce(func.sum(Act.amount), 0))
+    .where(Act.invoice_id == Invoice.id)
+    .correlate(Invoice)
+    .scalar_subquery()
+)
+FREE_ACTS_COUNT = (
+    select(func.count(Act.id))
+    .where(Act.contractor_id == Contractor.id, Act.invoice_id.is_(None))
+    .correlate(Contractor)
+    .scalar_subquery()
+)
+
+
+def _ids(values) -> set:
+    return {value for value in values if value is not None}
+
+
+def refresh_invoice_counters(session, invoice_ids=None) -> int:
+    statement = update(Invoice).values(
+        acts_count=ACTS_COUNT, acts_sum=ACTS_SUM, status=invoice_status(ACTS_SUM)
+    )
+    if invoice_ids is not None:
+        invoice_ids = _ids(invoice_ids)
+        if not invoice_ids:
+            return 0
+        statement = statement.where(Invoice.id.in_(invoice_ids))
+    return session.execute(
+        statement, execution_options={"synchronize_session": False}
+    ).rowcount
+
+
+def refresh_contractor_counters(session, contractor_ids=None) -> int:
+    statement = update(Contractor).values(free_acts_count=FREE_ACTS_COUNT)
+    if contractor_ids is not None:
+        contractor_ids = _ids(contractor_ids)
+        if not contractor_ids:
+            return 0
+        statement = statement.where(Contractor.id.in_(contractor_ids))
+    return session.execute(
+        statement, execution_options={"synchronize_session": False}
+    ).rowcount
+
+
+def refresh_counters(session, invoice_ids=(), contractor_ids=()):
+    session.flush()
+    refresh_invoice_counters(session, invoice_ids)
+    refresh_contractor_counters(session, contractor_ids)
+
+
+def add_free_acts(session, counts: dict):
+    params = [
+        {"contractor_id": contractor_id, "count": count}
+        for contractor_id, count in counts.items()
+        if contractor_id is not None and count
+    ]
+    if params:
+        session.connection().execute(
+            update(Contractor.__table__)
+            .where(Contractor.__table__.c.id == bindparam("contractor_id"))
+            .values(
+                free_acts_count=Contractor.__table__.c.free_acts_count
+                + bindparam("count")
+            ),
+            params,
+        )
+
+
+def repair_counters(session) -> dict:
+    return {
+        "invoices": refresh_invoice_counters(session),
+        "contractors": refresh_contractor_counters(session),
+    }
+
+
+def main():
+    init_db()
+    with session_scope() as session:
+        result = repair_counters(session)
+        session.commit()
+    print(
+        f"Пересчитаны счётчики актов: счетов {result['invoices']}, "
+        f"контрагентов {result['contractors']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
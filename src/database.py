@@ -1,12 +1,18 @@
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from sqlalchemy import (
     create_engine,
+    event,
     Column,
+    Boolean,
     Integer,
     Float,
     Date,
     DateTime,
     ForeignKey,
+    Index,
+    JSON,
     Text,
 )
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
@@ -21,6 +27,7 @@ class Contractor(Base):
     created_at = Column(DateTime, default=datetime.now)
     name = Column(Text, unique=True)
     inn = Column(Text)
+    free_acts_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     invoices = relationship("Invoice", back_populates="contractor")
     acts = relationship("Act", back_populates="contractor")
@@ -36,6 +43,10 @@ class Employee(Base):
     department = Column(Text, nullable=True)
     position = Column(Text, nullable=True)
 
+    __table_args__ = (
+        Index("ix_employees_last_name_first_name", "last_name", "first_name"),
+    )
+
 
 class StopWord(Base):
     __tablename__ = "stop_words"
@@ -60,10 +71,28 @@ class Invoice(Base):
     payment_date = Column(Date, nullable=True)
     motivated_person = Column(Text, nullable=True)
     status = Column(Text, default="Не оплачен")
+    source_hash = Column(Text, nullable=True)
+    import_run_id = Column(Integer, ForeignKey("import_runs.id"), nullable=True)
+    acts_count = Column(Integer, nullable=False, default=0, server_default="0")
+    acts_sum = Column(Float, nullable=False, default=0, server_default="0")
 
     contractor = relationship("Contractor", back_populates="invoices")
     acts = relationship("Act", back_populates="invoice")
 
+    __table_args__ = (
+        Index("ix_invoices_number_date_amount", "number", "date", "amount"),
+        Index("ix_invoices_contractor_id_date", "contractor_id", "date"),
+        Index("ix_invoices_contractor_id_status", "contractor_id", "status"),
+        Index("ix_invoices_date", "date"),
+        Index("ix_invoices_payment_date", "payment_date"),
+        Index("ix_invoices_deadline", "deadline"),
+        Index("ix_invoices_status", "status"),
+        Index("ix_invoices_motivated_person", "motivated_person"),
+        Index("ix_invoices_source_hash", "source_hash"),
+        Index("ix_invoices_import_run_id", "import_run_id"),
+        Index("ix_invoices_acts_count", "acts_count"),
+    )
+
 
 class Act(Base):
     __tablename__ = "acts"
@@ -76,36 +105,165 @@ class Act(Base):
     contractor_id = Column(Integer, ForeignKey("contractors.id"))
     invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)
     responsible_manager = Column(Text, nullable=True)
+    source_hash = Column(Text, nullable=True)
+    import_run_id = Column(Integer, ForeignKey("import_runs.id"), nullable=True)
 
     contractor = relationship("Contractor", back_populates="acts")
     invoice = relationship("Invoice", back_populates="acts")
 
+    __table_args__ = (
+        Index("ix_acts_number_signing_date_amount", "number", "signing_date", "amount"),
+        Index("ix_acts_invoice_id_amount", "invoice_id", "amount"),
+        Index("ix_acts_invoice_id_signing_date", "invoice_id", "signing_date"),
+        Index("ix_acts_contractor_id_invoice_id", "contractor_id", "invoice_id"),
+        Index("ix_acts_signing_date", "signing_date"),
+        Index("ix_acts_source_hash", "source_hash"),
+        Index("ix_acts_import_run_id", "import_run_id"),
+    )
+
+
+class ImportRun(Base):
+    __tablename__ = "import_runs"
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    kind = Column(Text)
+    filename = Column(Text, nullable=True)
+    rows_total = Column(Integer, default=0)
+    counters = Column(JSON, nullable=True)
+    dry_run = Column(Boolean, default=False)
+    file_hash = Column(Text, nullable=True)
+    undone_at = Column(DateTime, nullable=True)
+    timings = Column(JSON, nullable=True)
+
+    report_rows = relationship("ImportReportRow", back_populates="run")
+
+    __table_args__ = (Index("ix_import_runs_kind_file_hash", "kind", "file_hash"),)
+
+
+class ImportReportRow(Base):
+    __tablename__ = "import_report_rows"
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("import_runs.id"))
+    row_number = Column(Integer)
+    status = Column(Text)
+    number = Column(Text)
+    date = Column(DateTime, nullable=True)
+    amount = Column(Float, nullable=True)
+    contractor = Column(Text)
+    reasons = Column(Text)
+    details = Column(JSON)
+
+    run = relationship("ImportRun", back_populates="report_rows")
+
+    __table_args__ = (
+        Index("ix_import_report_rows_run_id_row_number", "run_id", "row_number"),
+        Index("ix_import_report_rows_run_id_status", "run_id", "status"),
+    )
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True)
+    name = Column(Text)
+    applied_at = Column(DateTime, default=datetime.now)
+
 
 def get_db_path():
     return os.path.join(os.path.dirname(os.path.dirname(__file__)), "database.db")
 
 
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -64000),
+    ("mmap_size", 268435456),
+    ("busy_timeout", 5000),
+    ("temp_store", "MEMORY"),
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("casefold", 1, _casefold, deterministic=True)
+
+
+def configure_sqlite_engine(engine):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(engine, "connect", _register_sqlite_functions)
+    return engine
+
+
+@lru_cache(maxsize=1)
 def get_engine():
     db_path = get_db_path()
-    return create_engine(f"sqlite:///{db_path}")
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    return configure_sqlite_engine(engine)
+
+
+@lru_cache(maxsize=1)
+def get_session_factory():
+    return sessionmaker(bind=get_engine())
 
 
 def get_session():
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    session = get_session_factory()()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def session_scope():
+    session = get_session_factory()()
+    try:
+        yield session
+    finally:
+        session.close()
 
 
 def init_db():
-    engine = get_engine()
-    Base.metadata.create_all(engine)
+    from .migrations import upgrade
+
+    upgrade(get_engine())
 
 
-def clear_db(keep_employees: bool = False, keep_stop_words: bool = False):
-    engine = get_engine()
+def explain_query_plan(session, statement) -> list:
+    statement = getattr(statement, "statement", statement)
+    compiled = statement.compile(
+        dialect=session.get_bind().dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+    return [row[3] for row in rows]
+
+
+def clear_db(keep_employees: bool = False, keep_stop_words: bool = False, engine=None):
+    engine = engine or get_engine()
     Base.metadata.bind = engine
 
-    tables_to_clear = [Invoice, Act, Contractor]
+    tables_to_clear = [ImportReportRow, Invoice, Act, Contractor, ImportRun]
 
     if not keep_stop_words:
         tables_to_clear.append(StopWord)
@@ -116,3 +274,7 @@ def clear_db(keep_employees: bool = False, keep_stop_words: bool = False):
     with engine.begin() as conn:
         for table in tables_to_clear:
             conn.execute(table.__table__.delete())
+
+    from .matching import invalidate_comment_matchers
+
+    invalidate_comment_matchers(engine)
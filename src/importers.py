@@ -0,0 +1,712 @@
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import ClassVar, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .coercion import DateTimeColumn, parse_amount, parse_datetime
+from .counters import add_free_acts, refresh_counters
+from .database import (
+    Contractor,
+    Invoice,
+    Act,
+    ImportRun,
+    ImportReportRow,
+)
+from .matching import get_comment_matcher
+from .normalization import normalize_contractor_name, normalize_contractor_names
+from .profiling import StageTimer, log_import, maybe_profile
+from .readers import build_col_map, open_rows
+from .statuses import STATUS_UNPAID
+
+IMPORT_CHUNK_SIZE = 1000
+DUPLICATE_LOOKUP_BATCH = 500
+MAX_KEPT_DRY_RUNS = 5
+
+STATUS_IMPORTED = "Импортирован"
+STATUS_SKIPPED = "Пропущен"
+STATUS_ERROR = "Ошибка"
+
+REPORT_COLUMNS = ("number", "amount", "contractor", "reasons")
+
+REQUIRED_COLUMNS_1C = [
+    "№ п/п",
+    "Дата",
+    "Номер",
+    "Сумма",
+    "Контрагент",
+    "Ответственный",
+    "Комментарий",
+    "Организация",
+]
+
+REQUIRED_COLUMNS_SBIS = [
+    "Тип документа",
+    "Тип пакета",
+    "Статус",
+    "Сумма",
+    "Завершено",
+    "Номер",
+    "Контрагент",
+    "ИНН/КПП",
+    "Имя файла",
+]
+
+
+def chunked(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ContractorResolver:
+    def __init__(self, session):
+        self.session = session
+        self.normalized = {}
+        self.ids = {}
+
+    def normalize(self, name: str) -> str:
+        normalized = self.normalized.get(name)
+        if normalized is None:
+            normalized = self.normalized[name] = normalize_contractor_name(name)
+        return normalized
+
+    def load(self, names) -> dict:
+        found = {}
+        for batch in chunked(names, DUPLICATE_LOOKUP_BATCH):
+            rows = self.session.query(Contractor.name, Contractor.id).filter(
+                Contractor.name.in_(batch)
+            )
+            found.update(rows)
+        return found
+
+    def resolve(self, entries):
+        entries = list(entries)
+        pending = list(
+            dict.fromkeys(name for name, _ in entries if name not in self.normalized)
+        )
+        self.normalized.update(zip(pending, normalize_contractor_names(pending)))
+
+        missing = {}
+        for name, inn in entries:
+            normalized = self.normalize(name)
+            if normalized not in self.ids and normalized not in missing:
+                missing[normalized] = inn
+        if not missing:
+            return
+
+        self.ids.update(self.load(list(missing)))
+        new = [
+            {"name": name, "inn": inn}
+            for name, inn in missing.items()
+            if name not in self.ids
+        ]
+        if new:
+            self.session.execute(
+                sqlite_insert(Contractor).on_conflict_do_nothing(
+                    index_elements=["name"]
+                ),
+                new,
+            )
+            self.ids.update(self.load([c["name"] for c in new]))
+
+    def get_id(self, name: str) -> int:
+        return self.ids[self.normalize(name)]
+
+
+def prune_dry_runs(session, kind: str, keep: int):
+    old_runs = (
+        session.query(ImportRun.id)
+        .filter(ImportRun.kind == kind, ImportRun.dry_run.is_(True))
+        .order_by(ImportRun.id.desc())
+        .offset(keep)
+        .all()
+    )
+    run_ids = [run_id for (run_id,) in old_runs]
+    if run_ids:
+        session.execute(
+            delete(ImportReportRow).where(ImportReportRow.run_id.in_(run_ids))
+        )
+        session.execute(delete(ImportRun).where(ImportRun.id.in_(run_ids)))
+
+
+class BaseImporter:
+    kind = ""
+    model = None
+    key_columns = ()
+    hash_columns = ()
+    status_key = "status"
+    counter_names = ()
+    duplicate_reason = ""
+    error_row: ClassVar[dict] = {}
+
+    def __init__(self, session, col_map: dict):
+        self.session = session
+        self.col_map = col_map
+        self.counters = dict.fromkeys(self.counter_names, 0)
+        self.seen_keys = set()
+        self.contractors = ContractorResolver(session)
+        self.rows_processed = 0
+        self.run_id = None
+        self.dry_run = False
+        self.force = False
+        self.hash_indexes = [col_map[c] - 1 for c in self.hash_columns if c in col_map]
+        self.inserted_hashes = set()
+
+    def value(self, row, column: str):
+        return row[self.col_map[column] - 1]
+
+    def text(self, row, column: str) -> str:
+        return str(self.value(row, column) or "").strip()
+
+    def skip(self, row_info: dict, reason: str):
+        if row_info[self.status_key] == STATUS_IMPORTED:
+            row_info[self.status_key] = STATUS_SKIPPED
+        row_info["reasons"].append(reason)
+
+    def classify(self, row):
+        raise NotImplementedError
+
+    def record(self, fields: dict) -> dict:
+        raise NotImplementedError
+
+    def report_date(self, fields: dict) -> Optional[datetime]:
+        raise NotImplementedError
+
+    def report_row(self, row_number: int, row_info: dict, fields) -> dict:
+        return {
+            "run_id": self.run_id,
+            "row_number": row_number,
+            "status": row_info[self.status_key],
+            "number": row_info["number"],
+            "date": self.report_date(fields) if fields else None,
+            "amount": row_info["amount"],
+            "contractor": row_info["contractor"],
+            "reasons": "\n".join(row_info["reasons"]),
+            "details": {
+                k: v
+                for k, v in row_info.items()
+                if k not in REPORT_COLUMNS and k != self.status_key
+            },
+        }
+
+    def update_counters(self, records: list):
+        pass
+
+    def row_hash(self, row) -> str:
+        values = [row[i] if i < len(row) else None for i in self.hash_indexes]
+        return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+    def find_known_hashes(self, hashes: set) -> set:
+        found = set()
+        for batch in chunked(hashes, DUPLICATE_LOOKUP_BATCH):
+            rows = self.session.query(self.model.source_hash).filter(
+                self.model.source_hash.in_(batch)
+            )
+            found.update(row_hash for (row_hash,) in rows)
+        return found - self.inserted_hashes
+
+    def find_existing_keys(self, keys: set) -> set:
+        number_column = getattr(self.model, self.key_columns[0])
+        columns = [getattr(self.model, name) for name in self.key_columns]
+        numbers = {key[0] for key in keys}
+        found = set()
+        for batch in chunked(numbers, DUPLICATE_LOOKUP_BATCH):
+            rows = self.session.query(*columns).filter(number_column.in_(batch))
+            found.update(tuple(row) for row in rows)
+        return found & keys
+
+    def process_chunk(self, rows):
+        first_row_number = self.rows_processed + 2
+        self.rows_processed += len(rows)
+        with self.timer.stage("hash", len(rows)):
+            hashes = [self.row_hash(row) for row in rows]
+            known = set() if self.force else self.find_known_hashes(set(hashes))
+
+        prepared = []
+        with self.timer.stage("classify", len(rows)):
+            for row_number, (row, row_hash) in enumerate(
+                zip(rows, hashes), first_row_number
+            ):
+                if row_hash in known:
+                    self.counters["skipped_known"] += 1
+                    continue
+                try:
+                    row_info, fields, key = self.classify(row)
+                except Exception as e:
+                    row_info = dict(self.error_row)
+                    row_info["reasons"] = [f"Ошибка обработки строки: {str(e)}"]
+                    fields = key = None
+                prepared.append((row_number, row_hash, row_info, fields, key))
+
+        accepted = []
+        report = []
+        with self.timer.stage("duplicates", len(prepared)):
+            keys = {key for *_, key in prepared if key is not None}
+            existing = self.find_existing_keys(keys) if keys else set()
+
+            for row_number, row_hash, row_info, fields, key in prepared:
+                if key is not None and (key in existing or key in self.seen_keys):
+                    self.skip(row_info, self.duplicate_reason)
+                    self.counters["skipped_duplicate"] += 1
+
+                if row_info[self.status_key] == STATUS_IMPORTED:
+                    if key is not None:
+                        self.seen_keys.add(key)
+                    accepted.append((fields, row_hash))
+                    self.counters["added"] += 1
+
+                report.append(self.report_row(row_number, row_info, fields))
+
+        if report:
+            with self.timer.stage("report", len(report)):
+                self.session.execute(insert(ImportReportRow), report)
+        if accepted and not self.dry_run:
+            with self.timer.stage("contractors", len(accepted)):
+                self.contractors.resolve(
+                    (fields["contractor_name"], fields.get("inn"))
+                    for fields, _ in accepted
+                )
+            with self.timer.stage("insert", len(accepted)):
+                records = [
+                    {
+                        **self.record(fields),
+                        "source_hash": row_hash,
+                        "import_run_id": self.run_id,
+                    }
+                    for fields, row_hash in accepted
+                ]
+                self.session.execute(insert(self.model), records)
+                self.update_counters(records)
+            self.inserted_hashes.update(row_hash for _, row_hash in accepted)
+
+    def run(
+        self,
+        rows,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        atomic: bool = True,
+        progress=None,
+        filename: Optional[str] = None,
+        dry_run: bool = False,
+        file_hash: Optional[str] = None,
+        force: bool = False,
+        profile: bool = False,
+    ) -> dict:
+        self.dry_run = dry_run
+        self.force = force
+        if dry_run:
+            atomic = False
+
+        with StageTimer(self.session.get_bind()) as self.timer:
+            with self.timer.stage("prepare"):
+                if dry_run:
+                    prune_dry_runs(self.session, self.kind, MAX_KEPT_DRY_RUNS - 1)
+                import_run = ImportRun(
+                    kind=self.kind,
+                    filename=filename,
+                    dry_run=dry_run,
+                    file_hash=file_hash,
+                )
+                self.session.add(import_run)
+                self.session.flush()
+                self.run_id = import_run.id
+                if not atomic:
+                    self.session.commit()
+
+            with maybe_profile(profile, f"import_{self.run_id}") as profiler:
+                chunks = chunked(rows, chunk_size)
+                while True:
+                    with self.timer.stage("read") as read:
+                        chunk = next(chunks, None)
+                        read["rows"] += len(chunk or ())
+                    if chunk is None:
+                        break
+                    self.process_chunk(chunk)
+                    if not atomic:
+                        with self.timer.stage("commit", len(chunk)):
+                            self.session.commit()
+                    if progress:
+                        progress(self.rows_processed, self.counters)
+
+                import_run.rows_total = self.rows_processed
+                import_run.counters = dict(self.counters)
+                import_run.finished_at = datetime.now()
+                with self.timer.stage("commit"):
+                    self.session.commit()
+
+        timings = self.timer.to_dict()
+        import_run.timings = timings
+        self.session.commit()
+        log_import(
+            {
+                "event": "import_finished",
+                "run_id": self.run_id,
+                "kind": self.kind,
+                "filename": filename,
+                "dry_run": dry_run,
+                "rows": self.rows_processed,
+                "counters": self.counters,
+                "timings": timings,
+            }
+        )
+        result = {
+            "success": True,
+            **self.counters,
+            "run_id": self.run_id,
+            "dry_run": dry_run,
+            "timings": timings,
+        }
+        if profiler:
+            result["profile_path"] = profiler["path"]
+        return result
+
+
+class InvoiceImporter(BaseImporter):
+    kind = "1c"
+    model = Invoice
+    key_columns = ("number", "date", "amount")
+    hash_columns = (
+        "Дата",
+        "Номер",
+        "Сумма",
+        "Контрагент",
+        "Ответственный",
+        "Комментарий",
+        "Организация",
+    )
+    counter_names = (
+        "added",
+        "skipped_zero",
+        "skipped_delete",
+        "skipped_responsible",
+        "skipped_stopwords",
+        "skipped_duplicate",
+        "skipped_known",
+    )
+    duplicate_reason = "Дубликат (счёт с такими реквизитами уже существует)"
+    error_row: ClassVar[dict] = {
+        "number": "",
+        "date": "",
+        "amount": None,
+        "contractor": "",
+        "status": STATUS_ERROR,
+    }
+
+    def __init__(self, session, col_map: dict):
+        super().__init__(session, col_map)
+        self.dates = DateTimeColumn()
+        self.matcher = get_comment_matcher(session)
+        self.rpo_surnames = self.matcher.surnames
+
+    def classify(self, row):
+        number = self.text(row, "Номер")
+        invoice_date = self.dates.parse_date(self.value(row, "Дата"))
+        amount = parse_amount(self.value(row, "Сумма"))
+        contractor_name = self.text(row, "Контрагент")
+        responsible = self.text(row, "Ответственный")
+        responsible_parts = responsible.split()
+        responsible_surname = responsible_parts[1] if len(responsible_parts) > 1 else ""
+        comment = self.text(row, "Комментарий")
+        comment_lower = comment.lower()
+        found_stop_words, surname_in_comment = self.matcher.match(comment_lower)
+        org_group = self.text(row, "Организация")
+
+        row_info = {
+            "number": number,
+            "date": invoice_date.strftime("%d.%m.%Y") if invoice_date else "",
+            "amount": amount,
+            "contractor": contractor_name,
+            "responsible": responsible,
+            "comment": comment,
+            "status": STATUS_IMPORTED,
+            "reasons": [],
+        }
+
+        if not amount or amount == 0:
+            self.skip(row_info, "Сумма = 0 или пустая")
+            self.counters["skipped_zero"] += 1
+
+        if "удалить" in comment_lower or "заглушка" in comment_lower:
+            self.skip(row_info, "В комментарии есть 'удалить' или 'заглушка'")
+            self.counters["skipped_delete"] += 1
+
+        keep = False
+        if responsible_surname.lower() in self.rpo_surnames:
+            keep = True
+            row_info["reasons"].append(
+                f"Ответственный '{responsible_surname}' найден в списке РПО"
+            )
+        elif surname_in_comment:
+            keep = True
+            row_info["reasons"].append("Фамилия РПО найдена в комментарии")
+
+        if not keep:
+            self.skip(
+                row_info,
+                f"Ответственный '{responsible_surname}' не относится к РПО/Продажи",
+            )
+            self.counters["skipped_responsible"] += 1
+
+        if found_stop_words:
+            self.skip(row_info, f"Найдены стоп-слова: {', '.join(found_stop_words)}")
+            self.counters["skipped_stopwords"] += 1
+
+        fields = {
+            "number": number,
+            "date": invoice_date,
+            "amount": amount,
+            "contractor_name": contractor_name,
+            "organization_group": org_group,
+            "responsible_import": responsible,
+            "comment": comment,
+        }
+        return row_info, fields, (number, invoice_date, amount)
+
+    def report_date(self, fields: dict) -> Optional[datetime]:
+        return parse_datetime(fields["date"])
+
+    def record(self, fields: dict) -> dict:
+        return {
+            "number": fields["number"],
+            "date": fields["date"],
+            "amount": fields["amount"],
+            "contractor_id": self.contractors.get_id(fields["contractor_name"]),
+            "organization_group": fields["organization_group"],
+            "responsible_import": fields["responsible_import"],
+            "comment": fields["comment"],
+            "status": STATUS_UNPAID,
+        }
+
+
+class ActImporter(BaseImporter):
+    kind = "sbis"
+    model = Act
+    key_columns = ("number", "signing_date", "amount")
+    hash_columns = REQUIRED_COLUMNS_SBIS
+    status_key = "import_status"
+    counter_names = (
+        "added",
+        "skipped_status",
+        "skipped_type",
+        "skipped_empty",
+        "skipped_duplicate",
+        "skipped_known",
+    )
+    duplicate_reason = "Дубликат (акт с такими реквизитами уже существует)"
+    error_row: ClassVar[dict] = {
+        "number": "",
+        "date": "",
+        "amount": None,
+        "contractor": "",
+        "inn": "",
+        "filename": "",
+        "doc_type": "",
+        "status": "",
+        "import_status": STATUS_ERROR,
+    }
+
+    def __init__(self, session, col_map: dict):
+        super().__init__(session, col_map)
+        self.signed = DateTimeColumn()
+
+    def classify(self, row):
+        doc_type = self.text(row, "Тип документа")
+        package_type = self.text(row, "Тип пакета")
+        status = self.text(row, "Статус")
+        amount = parse_amount(self.value(row, "Сумма"))
+        signing_datetime = self.signed.parse(self.value(row, "Завершено"))
+        number = self.text(row, "Номер")
+        contractor_name = self.text(row, "Контрагент")
+        inn_kpp = self.text(row, "ИНН/КПП")
+        inn = inn_kpp.split("/")[0] if inn_kpp else ""
+        filename = self.text(row, "Имя файла")
+
+        row_info = {
+            "number": number,
+            "date": signing_datetime.strftime("%d.%m.%Y %H:%M")
+            if signing_datetime
+            else "",
+            "amount": amount,
+            "contractor": contractor_name,
+            "inn": inn,
+            "filename": filename,
+            "doc_type": doc_type,
+            "package_type": package_type,
+            "status": status,
+            "import_status": STATUS_IMPORTED,
+            "reasons": [],
+        }
+
+        if doc_type == "ЭДОСч":
+            self.skip(row_info, f"Тип документа: {doc_type}")
+            self.counters["skipped_type"] += 1
+
+        if status != "Выполнение завершено успешно":
+            self.skip(
+                row_info,
+                f"Статус документа: '{status}' (ожидается 'Выполнение завершено успешно')",
+            )
+            self.counters["skipped_status"] += 1
+
+        if not amount or amount == 0:
+            if package_type != "ДокОтгрИсх":
+                self.skip(row_info, "Сумма = 0 или пустая")
+                self.counters["skipped_empty"] += 1
+
+        if not signing_datetime:
+            self.skip(row_info, "Дата подписания (Завершено) пустая")
+            self.counters["skipped_empty"] += 1
+
+        key = None
+        if number and signing_datetime and amount and amount != 0:
+            key = (number, signing_datetime, amount)
+
+        fields = {
+            "number": number,
+            "filename": filename,
+            "signing_date": signing_datetime,
+            "amount": amount,
+            "contractor_name": contractor_name,
+            "inn": inn,
+        }
+        return row_info, fields, key
+
+    def report_date(self, fields: dict) -> Optional[datetime]:
+        return fields["signing_date"]
+
+    def update_counters(self, records: list):
+        add_free_acts(
+            self.session, Counter(record["contractor_id"] for record in records)
+        )
+
+    def record(self, fields: dict) -> dict:
+        return {
+            "number": fields["number"],
+            "filename": fields["filename"],
+            "signing_date": fields["signing_date"],
+            "amount": fields["amount"],
+            "contractor_id": self.contractors.get_id(fields["contractor_name"]),
+        }
+
+
+def import_1c_rows(session, headers, rows, **options) -> dict:
+    col_map = build_col_map(headers)
+    for col in REQUIRED_COLUMNS_1C:
+        if col not in col_map:
+            return {"error": f"Missing column: {col}"}
+    return InvoiceImporter(session, col_map).run(rows, **options)
+
+
+def import_sbis_rows(session, headers, rows, **options) -> dict:
+    return ActImporter(session, build_col_map(headers)).run(rows, **options)
+
+
+IMPORT_RUNNERS = {"1c": import_1c_rows, "sbis": import_sbis_rows}
+IMPORTERS = {cls.kind: cls for cls in (InvoiceImporter, ActImporter)}
+
+
+def find_imported_file(session, kind: str, file_hash: str) -> Optional[int]:
+    return (
+        session.query(ImportRun.id)
+        .filter(
+            ImportRun.kind == kind,
+            ImportRun.file_hash == file_hash,
+            ImportRun.dry_run.is_(False),
+            ImportRun.finished_at.isnot(None),
+            ImportRun.undone_at.is_(None),
+        )
+        .order_by(ImportRun.id)
+        .limit(1)
+        .scalar()
+    )
+
+
+def undo_import_run(session, run_id: int) -> dict:
+    run = session.query(ImportRun).filter(ImportRun.id == run_id).first()
+    if not run:
+        return {"error": "Отчёт об импорте не найден", "success": False}
+    if run.dry_run:
+        return {"error": "Пробный запуск не записывал данные", "success": False}
+    if run.undone_at:
+        return {"error": "Импорт уже отменён", "success": False}
+
+    model = IMPORTERS[run.kind].model
+    unlinked_acts = 0
+    invoice_ids = contractor_ids = ()
+    if model is Invoice:
+        run_invoices = select(Invoice.id).where(Invoice.import_run_id == run_id)
+        contractor_ids = session.scalars(
+            select(Act.contractor_id).where(Act.invoice_id.in_(run_invoices)).distinct()
+        ).all()
+        unlinked_acts = session.execute(
+            update(Act).where(Act.invoice_id.in_(run_invoices)).values(invoice_id=None),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+    else:
+        run_acts = session.execute(
+            select(Act.invoice_id, Act.contractor_id)
+            .where(Act.import_run_id == run_id)
+            .distinct()
+        ).all()
+        invoice_ids = [invoice_id for invoice_id, _ in run_acts]
+        contractor_ids = [contractor_id for _, contractor_id in run_acts]
+    deleted = session.execute(
+        delete(model).where(model.import_run_id == run_id),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    refresh_counters(session, invoice_ids=invoice_ids, contractor_ids=contractor_ids)
+    run.undone_at = datetime.now()
+    session.commit()
+    return {
+        "success": True,
+        "run_id": run_id,
+        "deleted": deleted,
+        "unlinked_acts": unlinked_acts,
+    }
+
+
+def detect_kind(headers) -> Optional[str]:
+    col_map = build_col_map(headers)
+    for kind, columns in (
+        ("1c", REQUIRED_COLUMNS_1C),
+        ("sbis", REQUIRED_COLUMNS_SBIS),
+    ):
+        if all(col in col_map for col in columns):
+            return kind
+    return None
+
+
+def check_imported_file(session, kind: str, options: dict) -> Optional[dict]:
+    file_hash = options.get("file_hash")
+    if not file_hash or options.get("force"):
+        return None
+    imported_run_id = find_imported_file(session, kind, file_hash)
+    if imported_run_id:
+        return {
+            "error": f"Этот файл уже импортирован (импорт #{imported_run_id})",
+            "success": False,
+            "run_id": imported_run_id,
+        }
+    return None
+
+
+def import_rows(session, kind: str, headers, rows, **options) -> dict:
+    rejected = check_imported_file(session, kind, options)
+    if rejected:
+        return rejected
+    return IMPORT_RUNNERS[kind](session, headers, rows, **options)
+
+
+def run_import(session, kind: str, fileobj, **options) -> dict:
+    rejected = check_imported_file(session, kind, options)
+    if rejected:
+        return rejected
+    with open_rows(fileobj, options.get("filename")) as (headers, rows):
+        return IMPORT_RUNNERS[kind](session, headers, rows, **options)
@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Date, and_, case, func, or_
+from sqlalchemy.orm import contains_eager
+
+from .coercion import parse_date
+from .database import Contractor, Invoice
+
+INVOICE_PAGE_SIZE = 12
+MAX_INVOICE_PAGE_SIZE = 500
+
+INVOICE_SORT_COLUMNS = {
+    "date": Invoice.date,
+    "deadline": Invoice.deadline,
+    "contractor_name": Contractor.name,
+    "contractor_inn": Contractor.inn,
+    "responsible_import": Invoice.responsible_import,
+    "motivated_person": Invoice.motivated_person,
+    "payment_date": Invoice.payment_date,
+    "status": Invoice.status,
+}
+
+
+def filter_invoices(
+    query,
+    contractor_id: Optional[int] = None,
+    motivated_person: Optional[str] = None,
+    payment_date_from: Optional[str] = None,
+    payment_date_to: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    if contractor_id:
+        query = query.filter(Invoice.contractor_id == contractor_id)
+
+    if motivated_person:
+        query = query.filter(Invoice.motivated_person == motivated_person)
+
+    if payment_date_from:
+        from_date = parse_date(payment_date_from)
+        if from_date:
+            query = query.filter(Invoice.payment_date >= from_date)
+
+    if payment_date_to:
+        to_date = parse_date(payment_date_to)
+        if to_date:
+            query = query.filter(Invoice.payment_date <= to_date)
+
+    if status:
+        query = query.filter(Invoice.status == status)
+
+    return query
+
+
+def count_invoices(session, **filters) -> int:
+    return filter_invoices(session.query(func.count(Invoice.id)), **filters).scalar()
+
+
+FREE_ACTS_COUNT = func.coalesce(Contractor.free_acts_count, 0)
+INVOICE_AGGREGATES = (Invoice.acts_count, Invoice.acts_sum, FREE_ACTS_COUNT)
+
+
+def sort_keys(sort_by: Optional[str], sort_dir: Optional[str]) -> list:
+    desc = sort_dir == "desc"
+
+    if sort_by == "acts_count":
+        return [(Invoice.acts_count, desc), (Invoice.id, desc)]
+
+    if sort_by == "free_acts_count":
+        return [(FREE_ACTS_COUNT, desc), (Invoice.id, desc)]
+
+    column = INVOICE_SORT_COLUMNS.get(sort_by, Invoice.deadline)
+    return [
+        (case((Invoice.payment_date.is_(None), 1), else_=0), False),
+        (case((column.is_(None), 0), else_=1), desc),
+        (column, desc),
+        (Invoice.id, desc),
+    ]
+
+
+def order_invoices(query, keys: list):
+    return query.order_by(
+        *(column.desc() if desc else column.asc() for column, desc in keys)
+    )
+
+
+def keyset_after(keys: list, values: list):
+    terms = []
+    for i, (column, desc) in enumerate(keys):
+        if values[i] is None:
+            continue
+        equal = [
+            keys[j][0].is_(None) if values[j] is None else keys[j][0] == values[j]
+            for j in range(i)
+        ]
+        after = column < values[i] if desc else column > values[i]
+        terms.append(and_(*equal, after))
+    return or_(*terms)
+
+
+def encode_cursor(values) -> str:
+    payload = json.dumps(list(values), ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, keys: list) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Некорректный курсор страницы")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Курсор не соответствует сортировке")
+    for i, (column, desc) in enumerate(keys):
+        if values[i] is None:
+            continue
+        if isinstance(column.type, Date):
+            try:
+                values[i] = date.fromisoformat(values[i])
+            except (TypeError, ValueError):
+                raise ValueError("Курсор не соответствует сортировке")
+        elif type(values[i]) is not column.type.python_type:
+            raise ValueError("Курсор не соответствует сортировке")
+    return values
+
+
+def invoices_to_dicts(rows) -> list:
+    result = []
+    for inv, acts_count, acts_sum, free_acts_count in rows:
+        contractor = inv.contractor
+
+        result.append(
+            {
+                "id": inv.id,
+                "number": inv.number,
+                "date": inv.date.strftime("%d.%m.%Y") if inv.date else "",
+                "amount": inv.amount,
+                "contractor_id": inv.contractor_id,
+                "contractor_name": contractor.name if contractor else "",
+                "contractor_inn": contractor.inn if contractor else "",
+                "payment_date": inv.payment_date.strftime("%Y-%m-%d")
+                if inv.payment_date
+                else "",
+                "deadline": inv.deadline.strftime("%Y-%m-%d") if inv.deadline else "",
+                "deadline_days": inv.deadline_days,
+                "responsible_import": inv.responsible_import,
+                "motivated_person": inv.motivated_person,
+                "status": inv.status,
+                "acts_count": acts_count,
+                "acts_sum": acts_sum,
+                "free_acts_count": free_acts_count,
+            }
+        )
+    return result
+
+
+def query_invoices(
+    session,
+    sort_by: Optional[str] = "date",
+    sort_dir: Optional[str] = "desc",
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    **filters,
+):
+    keys = sort_keys(sort_by, sort_dir)
+    query = session.query(
+        Invoice, *INVOICE_AGGREGATES, *(column for column, desc in keys)
+    )
+    query = query.outerjoin(Contractor, Invoice.contractor_id == Contractor.id)
+    query = filter_invoices(query, **filters)
+    query = order_invoices(query, keys).options(contains_eager(Invoice.contractor))
+
+    if page_size is None:
+        return invoices_to_dicts(row[:4] for row in query)
+
+    page_size = max(1, min(page_size, MAX_INVOICE_PAGE_SIZE))
+    if cursor:
+        query = query.filter(keyset_after(keys, decode_cursor(cursor, keys)))
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return {
+        "success": True,
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1][4:]) if has_more else None,
+        "items": invoices_to_dicts(row[:4] for row in rows),
+    }
@@ -0,0 +1,138 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .batch import run_batch
+from .importers import run_import
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+IMPORT_WORKERS = 1
+MAX_KEPT_JOBS = 100
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+class ImportJob:
+    def __init__(self, kind: str, filename: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.rows_processed = 0
+        self.counters = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    def update_progress(self, rows_processed: int, counters: dict):
+        self.rows_processed = rows_processed
+        self.counters = dict(counters)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_processed": self.rows_processed,
+            "counters": self.counters,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+def _run_job(job: ImportJob, target, cleanup) -> dict:
+    job.status = JOB_RUNNING
+    job.started_at = datetime.now()
+    try:
+        result = target(job)
+    except Exception as e:
+        result = {"error": str(e)}
+    finally:
+        cleanup()
+
+    job.result = result
+    job.error = result.get("error")
+    job.status = JOB_FAILED if job.error else JOB_DONE
+    job.finished_at = datetime.now()
+    return result
+
+
+def _import_file(job: ImportJob, fileobj, session_factory, options: dict) -> dict:
+    session = session_factory()
+    try:
+        return run_import(
+            session,
+            job.kind,
+            fileobj,
+            progress=job.update_progress,
+            filename=job.filename,
+            **options,
+        )
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _forget_old_jobs():
+    finished = [j for j in _jobs.values() if j.status in (JOB_DONE, JOB_FAILED)]
+    for job in finished[: max(0, len(_jobs) - MAX_KEPT_JOBS)]:
+        del _jobs[job.id]
+
+
+def _submit(job: ImportJob, target, cleanup) -> ImportJob:
+    with _lock:
+        _forget_old_jobs()
+        _jobs[job.id] = job
+    job.future = _executor.submit(_run_job, job, target, cleanup)
+    return job
+
+
+def submit_import(
+    kind: str, filename: str, fileobj, session_factory, **options
+) -> ImportJob:
+    return _submit(
+        ImportJob(kind, filename),
+        lambda job: _import_file(job, fileobj, session_factory, options),
+        fileobj.close,
+    )
+
+
+def submit_batch_import(sources, session_factory, **options) -> ImportJob:
+    def close_sources():
+        for _, fileobj in sources:
+            fileobj.close()
+
+    return _submit(
+        ImportJob("batch", ", ".join(filename for filename, _ in sources)),
+        lambda job: run_batch(
+            session_factory, sources, progress=job.update_progress, **options
+        ),
+        close_sources,
+    )
+
+
+def get_job(job_id: str):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs() -> list:
+    with _lock:
+        return list(reversed(_jobs.values()))
@@ -0,0 +1,121 @@
+import threading
+import weakref
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .database import Employee, StopWord
+
+
+class KeywordMatcher:
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        goto = [{}]
+        out = [[]]
+        for i, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(i)
+
+        fail = [0] * len(goto)
+        delta = [dict(g) for g in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] = out[state] + out[fail[state]]
+            for ch, nxt in delta[fail[state]].items():
+                delta[state].setdefault(ch, nxt)
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        self.delta = delta
+        self.out = [frozenset(o) for o in out]
+
+    def find_indices(self, text: str) -> set:
+        delta = self.delta
+        out = self.out
+        found = set(out[0])
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+    def find_all(self, text: str) -> list:
+        found = self.find_indices(text)
+        return [p for i, p in enumerate(self.patterns) if i in found]
+
+
+class CommentMatcher:
+    def __init__(self, stop_words, surnames):
+        self.stop_words = list(stop_words)
+        self.surnames = set(surnames)
+        self.keywords = KeywordMatcher(self.stop_words + sorted(self.surnames))
+
+    def match(self, comment_lower: str):
+        found = self.keywords.find_indices(comment_lower)
+        if not found:
+            return [], False
+        n = len(self.stop_words)
+        stop_words = [sw for i, sw in enumerate(self.stop_words) if i in found]
+        surname_found = bool(comment_lower) and any(i >= n for i in found)
+        return stop_words, surname_found
+
+
+_matchers = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_generation = 0
+
+
+def get_comment_matcher(session) -> CommentMatcher:
+    engine = session.get_bind()
+    with _lock:
+        matcher = _matchers.get(engine)
+        generation = _generation
+    if matcher is None:
+        matcher = CommentMatcher(
+            [sw.word.lower() for sw in session.query(StopWord).all()],
+            {e.last_name.lower() for e in session.query(Employee).all()},
+        )
+        with _lock:
+            if _generation == generation:
+                _matchers[engine] = matcher
+    return matcher
+
+
+def invalidate_comment_matchers(engine=None):
+    global _generation
+    with _lock:
+        _generation += 1
+        if engine is None:
+            _matchers.clear()
+        else:
+            _matchers.pop(engine, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_keyword_changes(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, (Employee, StopWord)) for obj in changed):
+        session.info["keywords_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("keywords_changed", False):
+        invalidate_comment_matchers(session.get_bind())
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_keyword_changes(session):
+    session.info.pop("keywords_changed", None)
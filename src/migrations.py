@@ -0,0 +1,246 @@
+import argparse
+from collections import namedtuple
+
+from sqlalchemy import func, inspect, select
+
+from .database import Base, Invoice, SchemaMigration, get_engine
+
+Migration = namedtuple("Migration", ["version", "name", "upgrade"])
+
+MIGRATIONS = []
+
+
+def migration(version: int, name: str):
+    def decorator(upgrade_func):
+        MIGRATIONS.append(Migration(version, name, upgrade_func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade_func
+
+    return decorator
+
+
+def create_index(conn, name: str, table: str, *columns: str):
+    conn.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+
+
+def add_column(conn, table: str, name: str, ddl: str):
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if name not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+@migration(1, "Индексы для импорта, актов и счетов")
+def _hot_query_indexes(conn):
+    create_index(
+        conn,
+        "ix_employees_last_name_first_name",
+        "employees",
+        "last_name",
+        "first_name",
+    )
+    create_index(
+        conn, "ix_invoices_number_date_amount", "invoices", "number", "date", "amount"
+    )
+    create_index(
+        conn, "ix_invoices_contractor_id_date", "invoices", "contractor_id", "date"
+    )
+    create_index(
+        conn, "ix_invoices_contractor_id_status", "invoices", "contractor_id", "status"
+    )
+    create_index(conn, "ix_invoices_date", "invoices", "date")
+    create_index(conn, "ix_invoices_payment_date", "invoices", "payment_date")
+    create_index(conn, "ix_invoices_deadline", "invoices", "deadline")
+    create_index(conn, "ix_invoices_status", "invoices", "status")
+    create_index(conn, "ix_invoices_motivated_person", "invoices", "motivated_person")
+    create_index(
+        conn,
+        "ix_acts_number_signing_date_amount",
+        "acts",
+        "number",
+        "signing_date",
+        "amount",
+    )
+    create_index(conn, "ix_acts_invoice_id_amount", "acts", "invoice_id", "amount")
+    create_index(
+        conn, "ix_acts_invoice_id_signing_date", "acts", "invoice_id", "signing_date"
+    )
+    create_index(
+        conn, "ix_acts_contractor_id_invoice_id", "acts", "contractor_id", "invoice_id"
+    )
+    create_index(conn, "ix_acts_signing_date", "acts", "signing_date")
+
+
+@migration(2, "Отчёты об импорте")
+def _import_reports(conn):
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS import_runs (
+            id INTEGER NOT NULL PRIMARY KEY,
+            created_at DATETIME,
+            finished_at DATETIME,
+            kind TEXT,
+            filename TEXT,
+            rows_total INTEGER,
+            counters JSON
+        )
+        """
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS import_report_rows (
+            id INTEGER NOT NULL PRIMARY KEY,
+            run_id INTEGER REFERENCES import_runs (id),
+            row_number INTEGER,
+            status TEXT,
+            number TEXT,
+            date DATETIME,
+            amount FLOAT,
+            contractor TEXT,
+            reasons TEXT,
+            details JSON
+        )
+        """
+    )
+    create_index(
+        conn,
+        "ix_import_report_rows_run_id_row_number",
+        "import_report_rows",
+        "run_id",
+        "row_number",
+    )
+    create_index(
+        conn,
+        "ix_import_report_rows_run_id_status",
+        "import_report_rows",
+        "run_id",
+        "status",
+    )
+
+
+@migration(3, "Пробный запуск импорта")
+def _import_dry_run(conn):
+    add_column(conn, "import_runs", "dry_run", "BOOLEAN DEFAULT 0")
+
+
+@migration(4, "Хэши файлов и строк импорта")
+def _import_hashes(conn):
+    add_column(conn, "import_runs", "file_hash", "TEXT")
+    add_column(conn, "invoices", "source_hash", "TEXT")
+    add_column(conn, "acts", "source_hash", "TEXT")
+    create_index(
+        conn, "ix_import_runs_kind_file_hash", "import_runs", "kind", "file_hash"
+    )
+    create_index(conn, "ix_invoices_source_hash", "invoices", "source_hash")
+    create_index(conn, "ix_acts_source_hash", "acts", "source_hash")
+
+
+@migration(5, "Отмена импорта")
+def _import_undo(conn):
+    add_column(conn, "import_runs", "undone_at", "DATETIME")
+    add_column(conn, "invoices", "import_run_id", "INTEGER REFERENCES import_runs (id)")
+    add_column(conn, "acts", "import_run_id", "INTEGER REFERENCES import_runs (id)")
+    create_index(conn, "ix_invoices_import_run_id", "invoices", "import_run_id")
+    create_index(conn, "ix_acts_import_run_id", "acts", "import_run_id")
+
+
+@migration(6, "Замеры этапов импорта")
+def _import_timings(conn):
+    add_column(conn, "import_runs", "timings", "JSON")
+
+
+@migration(7, "Счётчики актов по счетам и контрагентам")
+def _act_counters(conn):
+    from .counters import repair_counters
+
+    add_column(conn, "invoices", "acts_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "invoices", "acts_sum", "FLOAT NOT NULL DEFAULT 0")
+    add_column(conn, "contractors", "free_acts_count", "INTEGER NOT NULL DEFAULT 0")
+    create_index(conn, "ix_invoices_acts_count", "invoices", "acts_count")
+    repair_counters(conn)
+
+
+@migration(8, "Статусы счетов по сумме актов")
+def _invoice_statuses(conn):
+    from .statuses import refresh_statuses
+
+    refresh_statuses(conn)
+
+
+def head_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(conn) -> int:
+    if not inspect(conn).has_table(SchemaMigration.__tablename__):
+        return 0
+    return conn.execute(select(func.max(SchemaMigration.version))).scalar() or 0
+
+
+def _record(conn, m: Migration):
+    conn.execute(
+        SchemaMigration.__table__.insert().values(version=m.version, name=m.name)
+    )
+
+
+def upgrade(engine=None) -> list:
+    engine = engine or get_engine()
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        fresh = not inspect(conn).has_table(Invoice.__tablename__)
+        Base.metadata.create_all(conn)
+        if fresh:
+            for m in MIGRATIONS:
+                _record(conn, m)
+        conn.commit()
+
+    applied = []
+    for m in MIGRATIONS:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            if current_version(conn) >= m.version:
+                continue
+            m.upgrade(conn)
+            _record(conn, m)
+            conn.commit()
+        applied.append(m)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.migrations", description="Миграции схемы базы данных"
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="upgrade",
+        choices=["upgrade", "current", "history"],
+    )
+    args = parser.parse_args(argv)
+    engine = get_engine()
+
+    if args.command == "upgrade":
+        applied = upgrade(engine)
+        for m in applied:
+            print(f"Применена миграция {m.version}: {m.name}")
+        if not applied:
+            print(f"Схема актуальна (версия {head_version()})")
+        return 0
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+
+    if args.command == "current":
+        print(version)
+    else:
+        for m in MIGRATIONS:
+            mark = "x" if m.version <= version else " "
+            print(f"[{mark}] {m.version}: {m.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+import re
+from functools import lru_cache
+
+LEGAL_FORMS = ("ооо", "ип", "ао", "зао", "оао", "пао", "нко", "ано", "фгуп", "муп")
+
+NORMALIZE_CACHE_SIZE = 16384
+FORMAT_CACHE_SIZE = 4096
+
+QUOTES_RE = re.compile(r'["""\'\",;]')
+SPACES_RE = re.compile(r"\s+")
+PARENTHESES_RE = re.compile(r"\s*\([^)]*\)\s*")
+LEGAL_FORM_RE = re.compile(
+    r"(" + "|".join(re.escape(form) for form in LEGAL_FORMS) + r")(?:\s|$)"
+)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_contractor_name(name: str) -> str:
+    if not name:
+        return name
+    name = name.strip()
+
+    name = QUOTES_RE.sub(" ", name)
+    name = SPACES_RE.sub(" ", name)
+
+    name = PARENTHESES_RE.sub(" ", name)
+
+    name = name.lower()
+
+    match = LEGAL_FORM_RE.search(name)
+    if match:
+        legal_form = match.group(1)
+        name = name.replace(legal_form, "").strip() + " " + legal_form
+    else:
+        name = SPACES_RE.sub(" ", name).strip()
+
+    return name.strip()
+
+
+def normalize_contractor_names(names) -> list:
+    normalized = {}
+    result = []
+    for name in names:
+        if name not in normalized:
+            normalized[name] = normalize_contractor_name(name)
+        result.append(normalized[name])
+    return result
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def capitalize_contractor_name(name: str) -> str:
+    if not name:
+        return name
+    result_parts = []
+    for part in name.strip().split():
+        if part.lower() in LEGAL_FORMS:
+            result_parts.append(part.upper())
+        else:
+            result_parts.append(part.capitalize())
+    return " ".join(result_parts)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_contractor_name(name: str) -> str:
+    if not name:
+        return name
+    result_parts = []
+    non_legal_parts = []
+    for part in name.strip().split():
+        if part.lower() in LEGAL_FORMS:
+            result_parts.append(part.upper())
+        else:
+            non_legal_parts.append(part.title())
+    return " ".join(non_legal_parts + result_parts)
+
+
+def normalization_cache_info() -> dict:
+    return {
+        func.__name__: func.cache_info()._asdict()
+        for func in (
+            normalize_contractor_name,
+            capitalize_contractor_name,
+            format_contractor_name,
+        )
+    }
@@ -0,0 +1,108 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "profiles")
+
+IMPORT_LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+IMPORT_LOG_HANDLER = "invoice_act.import.stderr"
+
+import_logger = logging.getLogger("invoice_act.import")
+
+
+def configure_import_logging(level: int = logging.INFO):
+    import_logger.setLevel(level)
+    if not any(h.name == IMPORT_LOG_HANDLER for h in import_logger.handlers):
+        handler = logging.StreamHandler()
+        handler.set_name(IMPORT_LOG_HANDLER)
+        handler.setFormatter(logging.Formatter(IMPORT_LOG_FORMAT))
+        import_logger.addHandler(handler)
+
+
+class StageTimer:
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.stages = {}
+        self.queries = 0
+        self.thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+
+    def count_query(self, *args):
+        if threading.get_ident() == self.thread:
+            self.queries += 1
+
+    def __enter__(self):
+        if self.engine is not None:
+            event.listen(self.engine, "before_cursor_execute", self.count_query)
+        return self
+
+    def __exit__(self, *exc):
+        if self.engine is not None:
+            event.remove(self.engine, "before_cursor_execute", self.count_query)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {
+                "wall": 0.0,
+                "cpu": 0.0,
+                "rows": 0,
+                "queries": 0,
+            }
+        wall, cpu, queries = time.perf_counter(), time.thread_time(), self.queries
+        try:
+            yield stats
+        finally:
+            stats["wall"] += time.perf_counter() - wall
+            stats["cpu"] += time.thread_time() - cpu
+            stats["rows"] += rows
+            stats["queries"] += self.queries - queries
+
+    def to_dict(self) -> dict:
+        wall = time.perf_counter() - self.started
+        stages = {}
+        for name, stats in self.stages.items():
+            stages[name] = {
+                "wall": round(stats["wall"], 4),
+                "cpu": round(stats["cpu"], 4),
+                "rows": stats["rows"],
+                "rows_per_second": round(stats["rows"] / stats["wall"])
+                if stats["wall"]
+                else None,
+                "queries": stats["queries"],
+            }
+        return {
+            "wall": round(wall, 4),
+            "cpu": round(time.thread_time() - self.cpu_started, 4),
+            "queries": self.queries,
+            "stages": stages,
+        }
+
+
+@contextmanager
+def maybe_profile(enabled: bool, name: str):
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    result = {"path": None}
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        result["path"] = os.path.join(PROFILE_DIR, f"{name}.pstats")
+        profiler.dump_stats(result["path"])
+
+
+def log_import(record: dict):
+    import_logger.info(json.dumps(record, ensure_ascii=False, default=str))
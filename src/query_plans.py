@@ -0,0 +1,102 @@
+import re
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+from .counters import ACTS_COUNT, ACTS_SUM, FREE_ACTS_COUNT
+from .database import (
+    Act,
+    Contractor,
+    Invoice,
+    explain_query_plan,
+    init_db,
+    session_scope,
+)
+from .statuses import STATUS_PAID, STATUS_UNPAID
+
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+
+
+def hot_queries(session) -> dict:
+    return {
+        "import_1c_duplicate": session.query(Invoice.id)
+        .filter(
+            Invoice.number == "1",
+            Invoice.date == date(2024, 1, 1),
+            Invoice.amount == 100.0,
+        )
+        .limit(1),
+        "import_sbis_duplicate": session.query(Act.id)
+        .filter(
+            Act.number == "1",
+            Act.signing_date == datetime(2024, 1, 1),
+            Act.amount == 100.0,
+        )
+        .limit(1),
+        "acts_by_invoice": session.query(Act).filter(Act.invoice_id == 1),
+        "acts_sum_by_invoice": session.query(
+            Act.invoice_id, func.count(Act.id), func.sum(Act.amount)
+        )
+        .filter(Act.invoice_id.in_([1, 2, 3]))
+        .group_by(Act.invoice_id),
+        "invoice_act_counters": session.query(Invoice.id, ACTS_COUNT, ACTS_SUM).filter(
+            Invoice.contractor_id == 1
+        ),
+        "contractor_free_acts_counter": session.query(
+            Contractor.id, FREE_ACTS_COUNT
+        ).filter(Contractor.id == 1),
+        "free_acts_by_contractor": session.query(Act).filter(
+            Act.contractor_id == 1, Act.invoice_id.is_(None)
+        ),
+        "unlinked_acts": session.query(Act)
+        .filter(Act.invoice_id.is_(None))
+        .order_by(Act.signing_date.desc()),
+        "invoices_by_contractor": session.query(Invoice)
+        .filter(Invoice.contractor_id == 1)
+        .order_by(Invoice.date.desc()),
+        "available_invoices": session.query(Invoice.id).filter(
+            Invoice.contractor_id.in_([1, 2, 3]), Invoice.status != STATUS_PAID
+        ),
+        "invoices_by_payment_date": session.query(Invoice).filter(
+            Invoice.payment_date >= date(2024, 1, 1),
+            Invoice.payment_date <= date(2024, 12, 31),
+        ),
+        "invoices_by_status": session.query(Invoice).filter(
+            Invoice.status == STATUS_UNPAID
+        ),
+        "invoices_by_import_run": session.query(Invoice.id).filter(
+            Invoice.import_run_id == 1
+        ),
+        "acts_by_import_run": session.query(Act.id).filter(Act.import_run_id == 1),
+        "invoices_sorted_by_deadline": session.query(Invoice)
+        .order_by(Invoice.deadline.desc())
+        .limit(50),
+    }
+
+
+def full_scans(plan: list) -> list:
+    return [m.group(1) for m in map(FULL_SCAN_RE.match, plan) if m]
+
+
+def check_query_plans(session) -> dict:
+    return {
+        name: explain_query_plan(session, query)
+        for name, query in hot_queries(session).items()
+    }
+
+
+def main():
+    init_db()
+    failed = False
+    with session_scope() as session:
+        for name, plan in check_query_plans(session).items():
+            scans = full_scans(plan)
+            failed = failed or bool(scans)
+            print(f"{'FULL SCAN' if scans else 'OK':<10} {name}")
+            for line in plan:
+                print(f"           {line}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,245 @@
+import codecs
+import csv
+import hashlib
+import importlib.util
+import os
+import pickle
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from itertools import islice
+from typing import Optional
+from xml.etree import ElementTree
+
+from openpyxl import load_workbook
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+CSV_EXTENSIONS = (".csv", ".tsv", ".txt")
+CSV_DELIMITERS = ";,\t|"
+CSV_SNIFF_SIZE = 64 * 1024
+ROW_SPOOL_CHUNK_SIZE = 5000
+
+XLSX_READER_ENV = "XLSX_READER"
+XLSX_READER_PREFERENCE = ("calamine", "openpyxl")
+XLSX_READERS = {}
+XLSX_NAMESPACE = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+async def spool_upload(file):
+    spooled = tempfile.TemporaryFile()
+    digest = hashlib.sha256()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        spooled.write(chunk)
+        digest.update(chunk)
+    spooled.seek(0)
+    return spooled, digest.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fileobj:
+        while chunk := fileobj.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def register_xlsx_reader(reader):
+    XLSX_READERS[reader.name] = reader
+    return reader
+
+
+@register_xlsx_reader
+class OpenpyxlReader:
+    name = "openpyxl"
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    @contextmanager
+    def open(self, fileobj):
+        wb = load_workbook(fileobj, read_only=True)
+        try:
+            ws = wb.active
+            headers = next(ws.iter_rows(max_row=1, values_only=True), ())
+            rows = ws.iter_rows(
+                min_row=2, max_col=len(headers) or None, values_only=True
+            )
+            yield headers, rows
+        finally:
+            wb.close()
+
+
+def xlsx_active_sheet(fileobj) -> int:
+    position = fileobj.tell()
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    except (KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+        return 0
+    finally:
+        fileobj.seek(position)
+    view = workbook.find(f"{XLSX_NAMESPACE}bookViews/{XLSX_NAMESPACE}workbookView")
+    try:
+        return int(view.get("activeTab", 0)) if view is not None else 0
+    except ValueError:
+        return 0
+
+
+def calamine_value(value):
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return int(value)
+    if type(value) is date:
+        return datetime.combine(value, time())
+    return value
+
+
+@register_xlsx_reader
+class CalamineReader:
+    name = "calamine"
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("python_calamine") is not None
+
+    @contextmanager
+    def open(self, fileobj):
+        from python_calamine import CalamineWorkbook
+
+        active = xlsx_active_sheet(fileobj)
+        wb = CalamineWorkbook.from_filelike(fileobj)
+        try:
+            if not 0 <= active < len(wb.sheet_names):
+                active = 0
+            sheet = wb.get_sheet_by_index(active)
+            padding = (None,) * sheet.start[1] if sheet.start else ()
+            rows = (
+                padding + tuple(map(calamine_value, row)) for row in sheet.iter_rows()
+            )
+            yield next(rows, ()), rows
+        finally:
+            wb.close()
+
+
+def get_xlsx_reader(name: Optional[str] = None):
+    name = name or os.environ.get(XLSX_READER_ENV)
+    if name:
+        if name not in XLSX_READERS:
+            raise ValueError(f"Unknown XLSX reader: {name}")
+        return XLSX_READERS[name]()
+    for reader_name in XLSX_READER_PREFERENCE:
+        reader = XLSX_READERS[reader_name]
+        if reader.available():
+            return reader()
+
+
+def open_xlsx_rows(fileobj, reader: Optional[str] = None):
+    return get_xlsx_reader(reader).open(fileobj)
+
+
+def detect_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1251"
+
+
+def detect_delimiter(sample: str, default: str = ";") -> str:
+    lines = sample.splitlines()
+    if len(lines) > 1 and not sample.endswith(("\n", "\r")):
+        sample = "\n".join(lines[:-1])
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return default
+
+
+def csv_row(values: list, width: int) -> tuple:
+    values = values[:width] + [""] * (width - len(values))
+    return tuple(value if value != "" else None for value in values)
+
+
+def csv_rows(reader, width: int):
+    for values in reader:
+        if any(value.strip() for value in values):
+            yield csv_row(values, width)
+
+
+def decode_lines(fileobj, encoding: str):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    tail = ""
+    while chunk := fileobj.read(UPLOAD_CHUNK_SIZE):
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+@contextmanager
+def open_csv_rows(fileobj, default_delimiter: str = ";"):
+    sample = fileobj.read(CSV_SNIFF_SIZE)
+    fileobj.seek(0)
+    encoding = detect_encoding(sample)
+    delimiter = detect_delimiter(
+        sample.decode(encoding, errors="ignore"), default_delimiter
+    )
+    reader = csv.reader(decode_lines(fileobj, encoding), delimiter=delimiter)
+    headers = next(reader, [])
+    yield headers, csv_rows(reader, len(headers))
+
+
+def is_csv_file(filename) -> bool:
+    return (filename or "").lower().endswith(CSV_EXTENSIONS)
+
+
+@contextmanager
+def open_rows(fileobj, filename=None):
+    if not is_csv_file(filename):
+        with open_xlsx_rows(fileobj) as rows:
+            yield rows
+        return
+    default_delimiter = "\t" if filename.lower().endswith(".tsv") else ";"
+    with open_csv_rows(fileobj, default_delimiter) as rows:
+        yield rows
+
+
+def spool_rows(path: str, chunk_size: int = ROW_SPOOL_CHUNK_SIZE):
+    spool_path = f"{path}.rows"
+    total = 0
+    with (
+        open(path, "rb") as fileobj,
+        open_rows(fileobj, os.path.basename(path)) as (headers, rows),
+        open(spool_path, "wb") as spool,
+    ):
+        while chunk := list(islice(rows, chunk_size)):
+            pickle.dump(chunk, spool, pickle.HIGHEST_PROTOCOL)
+            total += len(chunk)
+        return list(headers), spool_path, total
+
+
+def load_spooled_rows(spool_path: str):
+    with open(spool_path, "rb") as spool:
+        while True:
+            try:
+                chunk = pickle.load(spool)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def build_col_map(headers) -> dict:
+    col_map = {}
+    for i, h in enumerate(headers):
+        if h:
+            col_map[h.strip()] = i + 1
+    return col_map
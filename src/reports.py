@@ -0,0 +1,105 @@
+from typing import Optional
+
+from sqlalchemy import func
+
+from .database import ImportReportRow, ImportRun
+from .importers import IMPORTERS
+
+REPORT_PAGE_SIZE = 100
+MAX_REPORT_PAGE_SIZE = 1000
+
+REPORT_SORT_COLUMNS = {
+    "row_number": ImportReportRow.row_number,
+    "number": ImportReportRow.number,
+    "date": ImportReportRow.date,
+    "amount": ImportReportRow.amount,
+    "contractor": ImportReportRow.contractor,
+    "reasons": ImportReportRow.reasons,
+}
+
+
+def contains_casefold(column, term: str):
+    return func.casefold(column).contains(term.casefold(), autoescape=True)
+
+
+def run_to_dict(run: ImportRun) -> dict:
+    return {
+        "id": run.id,
+        "kind": run.kind,
+        "filename": run.filename,
+        "rows_total": run.rows_total,
+        "counters": run.counters or {},
+        "dry_run": bool(run.dry_run),
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "undone_at": run.undone_at.isoformat() if run.undone_at else None,
+        "timings": run.timings,
+    }
+
+
+def report_row_to_dict(row: ImportReportRow, status_key: str) -> dict:
+    return {
+        "row_number": row.row_number,
+        "number": row.number,
+        "amount": row.amount,
+        "contractor": row.contractor,
+        **(row.details or {}),
+        status_key: row.status,
+        "reasons": row.reasons.split("\n") if row.reasons else [],
+    }
+
+
+def query_report_rows(
+    session,
+    run: ImportRun,
+    page: int = 1,
+    page_size: int = REPORT_PAGE_SIZE,
+    status: Optional[str] = None,
+    reason: Optional[str] = None,
+    contractor: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    sort_by: str = "row_number",
+    sort_dir: str = "asc",
+) -> dict:
+    status_key = IMPORTERS[run.kind].status_key
+    query = session.query(ImportReportRow).filter(ImportReportRow.run_id == run.id)
+
+    if status:
+        query = query.filter(ImportReportRow.status == status)
+
+    if reason:
+        query = query.filter(contains_casefold(ImportReportRow.reasons, reason))
+
+    if contractor:
+        query = query.filter(contains_casefold(ImportReportRow.contractor, contractor))
+
+    if doc_type:
+        query = query.filter(
+            contains_casefold(ImportReportRow.details["doc_type"].as_string(), doc_type)
+        )
+
+    if sort_by == status_key:
+        sort_col = ImportReportRow.status
+    elif sort_by in REPORT_SORT_COLUMNS:
+        sort_col = REPORT_SORT_COLUMNS[sort_by]
+    elif sort_by:
+        sort_col = ImportReportRow.details[sort_by].as_string()
+    else:
+        sort_col = ImportReportRow.row_number
+    order = sort_col.desc() if sort_dir == "desc" else sort_col.asc()
+    query = query.order_by(order, ImportReportRow.row_number)
+
+    page_size = max(1, min(page_size, MAX_REPORT_PAGE_SIZE))
+    page = max(1, page)
+    total = query.count()
+    rows = query.offset((page - 1) * page_size).limit(page_size).all()
+
+    return {
+        "success": True,
+        "run": run_to_dict(run),
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size,
+        "rows": [report_row_to_dict(row, status_key) for row in rows],
+    }
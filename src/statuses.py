@@ -0,0 +1,31 @@
+from sqlalchemy import case, func, update
+
+from .database import Invoice
+
+STATUS_UNPAID = "Не оплачен"
+STATUS_PARTIAL = "Частично"
+STATUS_PAID = "Оплачен"
+STATUS_OVERPAID = "Ошибка суммы"
+INVOICE_STATUSES = (STATUS_UNPAID, STATUS_PARTIAL, STATUS_PAID, STATUS_OVERPAID)
+
+PAYMENT_TOLERANCE = 0.005
+
+
+def invoice_status(acts_sum, amount=Invoice.amount):
+    amount = func.coalesce(amount, 0)
+    return case(
+        (acts_sum <= PAYMENT_TOLERANCE, STATUS_UNPAID),
+        (func.abs(acts_sum - amount) <= PAYMENT_TOLERANCE, STATUS_PAID),
+        (acts_sum < amount, STATUS_PARTIAL),
+        else_=STATUS_OVERPAID,
+    )
+
+
+def refresh_statuses(session) -> int:
+    status = invoice_status(Invoice.acts_sum)
+    return session.execute(
+        update(Invoice)
+        .where(Invoice.status.is_distinct_from(status))
+        .values(status=status),
+        execution_options={"synchronize_session": False},
+    ).rowcount
@@ -4,11 +4,16 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.database import Base, get_session
+from src.database import (
+    Base,
+    _register_sqlite_functions,
+    get_session,
+    get_session_factory,
+)
 from src.main import app
 
 
@@ -22,6 +27,7 @@ def test_engine():
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    event.listen(engine, "connect", _register_sqlite_functions)
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
@@ -37,7 +43,7 @@ def test_session(test_engine):
 
 
 @pytest.fixture(scope="function")
-def client(test_session):
+def client(test_engine, test_session):
     def override_get_session():
         try:
             yield test_session
@@ -45,6 +51,9 @@ def client(test_session):
             pass
 
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(
+        bind=test_engine
+    )
     from fastapi.testclient import TestClient
 
     with TestClient(app) as test_client:
@@ -1,5 +1,38 @@
+import base64
+import json
+import time
+import zipfile
+from datetime import date, datetime
 from io import BytesIO
 
+import pytest
+from openpyxl import Workbook
+
+from src.counters import repair_counters
+from src.database import Act, Contractor, Employee, Invoice, clear_db
+from src.importers import REQUIRED_COLUMNS_1C, REQUIRED_COLUMNS_SBIS
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def make_xlsx(headers, rows) -> BytesIO:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def upload(client, url, buffer, **data):
+    data.setdefault("background", "false")
+    return client.post(
+        url, files={"file": ("import.xlsx", buffer, XLSX_MIME)}, data=data
+    )
+
 
 class TestEmployeesAPI:
     """Интеграционные тесты для API сотрудников"""
@@ -95,6 +128,442 @@ class TestImportExcel:
         assert response.status_code in (200, 400, 500)
 
 
+class TestImportPipeline:
+    """Интеграционные тесты для конвейера импорта"""
+
+    def test_import_1c_rows(self, client, test_session):
+        """Тест: импорт счетов из 1С с фильтрами и дубликатами"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [
+            [1, "15.03.2024", "A-1", 1000, "Альфа, ООО", "Пётр Петров", "", "Орг"],
+            [2, "15.03.2024", "A-1", 1000, "Альфа, ООО", "Пётр Петров", "", "Орг"],
+            [3, "16.03.2024", "A-2", 0, "Альфа, ООО", "Пётр Петров", "", "Орг"],
+            [4, "16.03.2024", "A-3", 500, "Бета ООО", "Иван Иванов", "", "Орг"],
+            [5, "17.03.2024", "A-4", 700, "Бета ООО", "Иван Иванов", "петров", "Орг"],
+        ]
+        result = upload(
+            client, "/import-1c", make_xlsx(REQUIRED_COLUMNS_1C, rows)
+        ).json()
+
+        assert result["added"] == 2
+        assert result["skipped_duplicate"] == 1
+        assert result["skipped_zero"] == 1
+        assert result["skipped_responsible"] == 1
+        assert "rows_detail" not in result
+        report = client.get(f"/import/runs/{result['run_id']}/rows").json()
+        statuses = [r["status"] for r in report["rows"]]
+        assert statuses == [
+            "Импортирован",
+            "Пропущен",
+            "Пропущен",
+            "Пропущен",
+            "Импортирован",
+        ]
+        assert report["rows"][1]["reasons"][-1] == (
+            "Дубликат (счёт с такими реквизитами уже существует)"
+        )
+        assert test_session.query(Invoice).count() == 2
+
+    def test_import_1c_dry_run(self, client, test_session):
+        """Тест: пробный импорт показывает результат без записи счетов"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [[1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"]]
+        result = upload(
+            client, "/import-1c", make_xlsx(REQUIRED_COLUMNS_1C, rows), dry_run="true"
+        ).json()
+
+        assert result["dry_run"] is True
+        assert result["added"] == 1
+        assert test_session.query(Invoice).count() == 0
+        run = client.get(f"/import/runs/{result['run_id']}").json()
+        assert run["dry_run"] is True
+
+    def test_same_file_rejected(self, client, test_session):
+        """Тест: повторная загрузка того же файла отклоняется"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [[1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"]]
+        data = make_xlsx(REQUIRED_COLUMNS_1C, rows).getvalue()
+
+        first = upload(client, "/import-1c", BytesIO(data)).json()
+        second = upload(client, "/import-1c", BytesIO(data)).json()
+        forced = upload(client, "/import-1c", BytesIO(data), force="true").json()
+
+        assert first["added"] == 1
+        assert second["success"] is False
+        assert second["run_id"] == first["run_id"]
+        assert forced["skipped_duplicate"] == 1
+        assert test_session.query(Invoice).count() == 1
+
+    def test_same_file_after_clear(self, client, test_session, test_engine):
+        """Тест: после очистки базы тот же файл снова импортируется"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [[1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"]]
+        data = make_xlsx(REQUIRED_COLUMNS_1C, rows).getvalue()
+        assert upload(client, "/import-1c", BytesIO(data)).json()["added"] == 1
+
+        clear_db(keep_employees=True, keep_stop_words=True, engine=test_engine)
+        test_session.expire_all()
+
+        assert client.get("/import/runs").json() == []
+        again = upload(client, "/import-1c", BytesIO(data)).json()
+        assert again["success"] is True
+        assert again["added"] == 1
+        assert test_session.query(Invoice).count() == 1
+
+    def test_import_csv(self, client, test_session):
+        """Тест: импорт из CSV в кодировке Windows-1251"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        text = ";".join(REQUIRED_COLUMNS_1C) + "\n"
+        text += "1;15.03.2024;A-1;1 000,50;Альфа, ООО;Пётр Петров;;Орг\n"
+        text += "2;15.03.2024;A-2;0;Альфа, ООО;Пётр Петров;;Орг\n"
+        result = client.post(
+            "/import-1c",
+            files={"file": ("import.csv", BytesIO(text.encode("cp1251")), "text/csv")},
+            data={"background": "false"},
+        ).json()
+
+        assert result["added"] == 1
+        assert result["skipped_zero"] == 1
+        invoice = test_session.query(Invoice).one()
+        assert invoice.amount == 1000.5
+        assert invoice.contractor.name == "альфа ооо"
+
+    def test_import_1c_missing_column(self, client):
+        """Тест: ошибка при отсутствии обязательной колонки"""
+        result = upload(
+            client, "/import-1c", make_xlsx(REQUIRED_COLUMNS_1C[:-1], [])
+        ).json()
+        assert result == {"error": "Missing column: Организация"}
+
+    def test_import_sbis_rows(self, client, test_session):
+        """Тест: импорт актов из СБИС с фильтрами и дубликатами"""
+        ok = "Выполнение завершено успешно"
+        signed = datetime(2024, 3, 15, 10, 30)
+        rows = [
+            ["Акт", "", ok, 1000, signed, "S-1", "Альфа ООО", "7701/01", "a.xml"],
+            ["Акт", "", ok, 1000, signed, "S-1", "Альфа ООО", "7701/01", "a.xml"],
+            ["ЭДОСч", "", ok, 100, signed, "S-2", "Альфа ООО", "7701/01", "b.xml"],
+            ["Акт", "", "Ошибка", 100, signed, "S-3", "Альфа ООО", "", "c.xml"],
+            ["Акт", "ДокОтгрИсх", ok, 0, signed, "S-4", "Альфа ООО", "", "d.xml"],
+        ]
+        result = upload(
+            client, "/import-sbis", make_xlsx(REQUIRED_COLUMNS_SBIS, rows)
+        ).json()
+
+        assert result["added"] == 2
+        assert result["skipped_duplicate"] == 1
+        assert result["skipped_type"] == 1
+        assert result["skipped_status"] == 1
+        report = client.get(f"/import/runs/{result['run_id']}/rows").json()
+        statuses = [r["import_status"] for r in report["rows"]]
+        assert statuses == [
+            "Импортирован",
+            "Пропущен",
+            "Пропущен",
+            "Пропущен",
+            "Импортирован",
+        ]
+        assert test_session.query(Act).count() == 2
+
+
+class TestImportReports:
+    """Интеграционные тесты для отчётов об импорте"""
+
+    def import_sbis(self, client):
+        ok = "Выполнение завершено успешно"
+        rows = [
+            ["Акт", "", ok, 300, datetime(2024, 3, 3), "S-1", "Альфа", "", "a"],
+            ["ЭДОСч", "", ok, 100, datetime(2024, 3, 1), "S-2", "Бета", "", "b"],
+            ["Акт", "", "Ошибка", 200, datetime(2024, 3, 2), "S-3", "Бета", "", "c"],
+            ["Акт", "", ok, 400, datetime(2024, 3, 4), "S-4", "Альфа", "", "d"],
+        ]
+        result = upload(
+            client, "/import-sbis", make_xlsx(REQUIRED_COLUMNS_SBIS, rows)
+        ).json()
+        return result["run_id"]
+
+    def rows(self, client, run_id, **params):
+        return client.get(f"/import/runs/{run_id}/rows", params=params).json()
+
+    def test_run_summary(self, client):
+        """Тест: сводка запуска импорта хранит счётчики"""
+        run_id = self.import_sbis(client)
+        run = client.get(f"/import/runs/{run_id}").json()
+        assert run["kind"] == "sbis"
+        assert run["timings"]["stages"]["classify"]["rows"] == 4
+        assert run["filename"] == "import.xlsx"
+        assert run["rows_total"] == 4
+        assert run["counters"]["added"] == 2
+        assert client.get("/import/runs").json()[0]["id"] == run_id
+
+    def test_rows_are_paged(self, client):
+        """Тест: строки отчёта отдаются постранично"""
+        run_id = self.import_sbis(client)
+        report = self.rows(client, run_id, page=2, page_size=3)
+        assert report["total"] == 4
+        assert report["pages"] == 2
+        assert [r["number"] for r in report["rows"]] == ["S-4"]
+        assert report["rows"][0]["row_number"] == 5
+        assert report["rows"][0]["date"] == "04.03.2024 00:00"
+        assert report["rows"][0]["filename"] == "d"
+
+    def test_filters(self, client):
+        """Тест: фильтрация строк отчёта по статусу, причине и типу документа"""
+        run_id = self.import_sbis(client)
+        skipped = self.rows(client, run_id, status="Пропущен")
+        assert [r["number"] for r in skipped["rows"]] == ["S-2", "S-3"]
+        by_reason = self.rows(client, run_id, reason="Статус документа")
+        assert [r["number"] for r in by_reason["rows"]] == ["S-3"]
+        by_type = self.rows(client, run_id, doc_type="ЭДОСч")
+        assert [r["number"] for r in by_type["rows"]] == ["S-2"]
+
+    def test_filters_ignore_case(self, client):
+        """Тест: поиск по причине, контрагенту и типу документа не зависит от регистра"""
+        run_id = self.import_sbis(client)
+        by_reason = self.rows(client, run_id, reason="СТАТУС документа")
+        assert [r["number"] for r in by_reason["rows"]] == ["S-3"]
+        by_contractor = self.rows(client, run_id, contractor="АЛЬФА")
+        assert [r["number"] for r in by_contractor["rows"]] == ["S-1", "S-4"]
+        by_type = self.rows(client, run_id, doc_type="эдосч")
+        assert [r["number"] for r in by_type["rows"]] == ["S-2"]
+
+    def test_sorting(self, client):
+        """Тест: сортировка строк отчёта по дате и сумме"""
+        run_id = self.import_sbis(client)
+        by_date = self.rows(client, run_id, sort_by="date")
+        assert [r["number"] for r in by_date["rows"]] == ["S-2", "S-3", "S-1", "S-4"]
+        by_amount = self.rows(client, run_id, sort_by="amount", sort_dir="desc")
+        assert [r["number"] for r in by_amount["rows"]] == ["S-4", "S-1", "S-3", "S-2"]
+
+    def test_unknown_run(self, client):
+        """Тест: запрос несуществующего отчёта"""
+        assert client.get("/import/runs/999/rows").json()["success"] is False
+
+
+class TestImportUndo:
+    """Интеграционные тесты для отмены импорта"""
+
+    def import_1c(self, client, test_session):
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [
+            [1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"],
+            [2, "16.03.2024", "A-2", 2000, "Альфа", "Пётр Петров", "", "Орг"],
+        ]
+        return upload(client, "/import-1c", make_xlsx(REQUIRED_COLUMNS_1C, rows)).json()
+
+    def test_undo_invoices(self, client, test_session):
+        """Тест: отмена импорта удаляет счета и отвязывает их акты"""
+        result = self.import_1c(client, test_session)
+        invoice = test_session.query(Invoice).filter(Invoice.number == "A-1").one()
+        act = Act(number="S-1", amount=1000, invoice_id=invoice.id)
+        test_session.add(act)
+        test_session.commit()
+
+        undo = client.post(f"/import/runs/{result['run_id']}/undo").json()
+
+        assert undo == {
+            "success": True,
+            "run_id": result["run_id"],
+            "deleted": 2,
+            "unlinked_acts": 1,
+        }
+        test_session.expire_all()
+        assert test_session.query(Invoice).count() == 0
+        assert test_session.get(Act, act.id).invoice_id is None
+        run = client.get(f"/import/runs/{result['run_id']}").json()
+        assert run["undone_at"]
+
+    def test_undo_keeps_other_runs(self, client, test_session):
+        """Тест: отменяются только записи выбранного импорта"""
+        ok = "Выполнение завершено успешно"
+        first = upload(
+            client,
+            "/import-sbis",
+            make_xlsx(
+                REQUIRED_COLUMNS_SBIS,
+                [["Акт", "", ok, 1, datetime(2024, 3, 1), "S-1", "А", "", "a"]],
+            ),
+        ).json()
+        second = upload(
+            client,
+            "/import-sbis",
+            make_xlsx(
+                REQUIRED_COLUMNS_SBIS,
+                [["Акт", "", ok, 2, datetime(2024, 3, 2), "S-2", "А", "", "b"]],
+            ),
+        ).json()
+
+        client.post(f"/import/runs/{second['run_id']}/undo")
+
+        assert [a.number for a in test_session.query(Act)] == ["S-1"]
+        assert test_session.query(Act).one().import_run_id == first["run_id"]
+
+    def test_file_can_be_imported_again(self, client, test_session):
+        """Тест: после отмены тот же файл можно загрузить повторно"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [[1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"]]
+        data = make_xlsx(REQUIRED_COLUMNS_1C, rows).getvalue()
+        first = upload(client, "/import-1c", BytesIO(data)).json()
+        client.post(f"/import/runs/{first['run_id']}/undo")
+
+        again = upload(client, "/import-1c", BytesIO(data)).json()
+
+        assert again["added"] == 1
+        assert again["skipped_known"] == 0
+
+    def test_undo_twice(self, client, test_session):
+        """Тест: повторная отмена и отмена пробного запуска отклоняются"""
+        result = self.import_1c(client, test_session)
+        client.post(f"/import/runs/{result['run_id']}/undo")
+        assert client.post(f"/import/runs/{result['run_id']}/undo").json() == {
+            "error": "Импорт уже отменён",
+            "success": False,
+        }
+        dry = upload(
+            client, "/import-1c", make_xlsx(REQUIRED_COLUMNS_1C, []), dry_run="true"
+        ).json()
+        assert (
+            client.post(f"/import/runs/{dry['run_id']}/undo").json()["success"] is False
+        )
+        assert client.post("/import/runs/999/undo").json()["success"] is False
+
+
+class TestImportJobs:
+    """Интеграционные тесты для фоновых задач импорта"""
+
+    def wait_for_job(self, client, job_id):
+        for _ in range(200):
+            job = client.get(f"/import/jobs/{job_id}").json()
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.05)
+        raise AssertionError("import job did not finish")
+
+    def test_background_import(self, client, test_session):
+        """Тест: импорт в фоне возвращает id задачи и итоговый отчёт"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        rows = [[1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"]]
+        response = upload(
+            client,
+            "/import-1c",
+            make_xlsx(REQUIRED_COLUMNS_1C, rows),
+            background="true",
+        ).json()
+        assert response["success"] is True
+        assert response["job_id"]
+
+        job = self.wait_for_job(client, response["job_id"])
+
+        assert job["status"] == "done"
+        assert job["kind"] == "1c"
+        assert job["rows_processed"] == 1
+        assert job["counters"]["added"] == 1
+        assert job["result"]["added"] == 1
+
+    def test_failed_background_import(self, client):
+        """Тест: ошибка чтения файла отражается в статусе задачи"""
+        response = client.post(
+            "/import-sbis",
+            files={"file": ("bad.xlsx", BytesIO(b"not an excel file"), XLSX_MIME)},
+        ).json()
+        job = self.wait_for_job(client, response["job_id"])
+        assert job["status"] == "failed"
+        assert job["error"]
+
+    def test_unknown_job(self, client):
+        """Тест: запрос несуществующей задачи"""
+        response = client.get("/import/jobs/unknown").json()
+        assert response["success"] is False
+
+
+class TestBatchImport:
+    """Интеграционные тесты для пакетного импорта"""
+
+    def batch(self, client, files, **data):
+        data.setdefault("background", "false")
+        return client.post("/import/batch", files=files, data=data).json()
+
+    def files_1c_and_sbis(self):
+        ok = "Выполнение завершено успешно"
+        rows_1c = [[1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"]]
+        rows_sbis = [
+            ["Акт", "", ok, 1000, datetime(2024, 3, 15), "S-1", "Альфа", "", "a"],
+            ["ЭДОСч", "", ok, 100, datetime(2024, 3, 15), "S-2", "Альфа", "", "b"],
+        ]
+        return [
+            ("invoices.xlsx", make_xlsx(REQUIRED_COLUMNS_1C, rows_1c).getvalue()),
+            ("acts.xlsx", make_xlsx(REQUIRED_COLUMNS_SBIS, rows_sbis).getvalue()),
+        ]
+
+    def test_several_files(self, client, test_session):
+        """Тест: тип каждого файла определяется по заголовкам"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        files = [
+            ("files", (name, BytesIO(data), XLSX_MIME))
+            for name, data in self.files_1c_and_sbis()
+        ]
+        result = self.batch(client, files)
+
+        assert result["success"] is True
+        assert result["files_total"] == 2
+        assert result["files_failed"] == 0
+        assert [f["kind"] for f in result["files"]] == ["1c", "sbis"]
+        assert result["totals"]["1c"]["added"] == 1
+        assert result["totals"]["sbis"]["added"] == 1
+        assert result["totals"]["sbis"]["skipped_type"] == 1
+        assert test_session.query(Invoice).count() == 1
+        assert test_session.query(Act).count() == 1
+        run = client.get(f"/import/runs/{result['files'][1]['run_id']}").json()
+        assert run["filename"] == "acts.xlsx"
+
+    def test_zip_archive(self, client, test_session):
+        """Тест: файлы из ZIP-архива импортируются по порядку"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            for name, data in self.files_1c_and_sbis():
+                zf.writestr(name, data)
+            zf.writestr("readme.pdf", "не импортируется")
+        archive.seek(0)
+        result = self.batch(
+            client,
+            [("files", ("export.zip", archive, "application/zip"))],
+            dry_run="true",
+        )
+
+        assert [f["filename"] for f in result["files"]] == [
+            "export.zip/invoices.xlsx",
+            "export.zip/acts.xlsx",
+        ]
+        assert all(f["dry_run"] for f in result["files"])
+        assert test_session.query(Invoice).count() == 0
+
+    def test_unknown_file(self, client):
+        """Тест: файл с неизвестными заголовками не прерывает пакет"""
+        name, data = self.files_1c_and_sbis()[1]
+        files = [
+            ("files", ("other.xlsx", make_xlsx(["Колонка"], [[1]]), XLSX_MIME)),
+            ("files", ("bad.xlsx", BytesIO(b"not an excel file"), XLSX_MIME)),
+            ("files", (name, BytesIO(data), XLSX_MIME)),
+        ]
+        result = self.batch(client, files)
+
+        assert result["files_failed"] == 2
+        assert "Не удалось определить тип" in result["files"][0]["error"]
+        assert "Не удалось прочитать файл" in result["files"][1]["error"]
+        assert result["files"][2]["added"] == 1
+
+
 class TestContractorsAPI:
     """Интеграционные тесты для API контрагентов"""
 
@@ -135,6 +604,253 @@ class TestInvoicesAPI:
         assert response.status_code in (200, 302, 303, 404)
 
 
+class TestInvoicesPagination:
+    """Интеграционные тесты для постраничной выдачи счетов"""
+
+    def seed(self, test_session):
+        contractors = [Contractor(name=f"Контрагент {i}", inn=None) for i in range(3)]
+        test_session.add_all(contractors)
+        test_session.flush()
+        for i in range(17):
+            test_session.add(
+                Invoice(
+                    number=f"N-{i}",
+                    date=date(2024, 1, 1 + i % 5),
+                    amount=100 + i,
+                    contractor_id=contractors[i % 3].id,
+                    deadline=date(2024, 2, 1 + i % 4) if i % 3 else None,
+                    payment_date=date(2024, 3, 1 + i % 6) if i % 4 else None,
+                    motivated_person="Петров Пётр" if i % 2 else None,
+                )
+            )
+        test_session.flush()
+        invoice = test_session.query(Invoice).filter(Invoice.number == "N-3").one()
+        test_session.add_all(
+            [
+                Act(number="A-1", amount=10, contractor_id=contractors[0].id),
+                Act(
+                    number="A-2",
+                    amount=20,
+                    contractor_id=invoice.contractor_id,
+                    invoice_id=invoice.id,
+                ),
+            ]
+        )
+        repair_counters(test_session)
+        test_session.commit()
+
+    def walk(self, client, page_size, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, page_size=page_size)
+            if cursor:
+                query["cursor"] = cursor
+            page = client.get("/invoices/list", params=query).json()
+            assert len(page["items"]) <= page_size
+            ids.extend(item["id"] for item in page["items"])
+            if not page["has_more"]:
+                assert page["next_cursor"] is None
+                return ids
+            cursor = page["next_cursor"]
+
+    def test_pages_match_full_list(self, client, test_session):
+        """Тест: страницы по курсору совпадают с полным списком при любой сортировке"""
+        self.seed(test_session)
+        for sort_by in [
+            "date",
+            "deadline",
+            "contractor_name",
+            "contractor_inn",
+            "motivated_person",
+            "payment_date",
+            "acts_count",
+            "free_acts_count",
+        ]:
+            for sort_dir in ("asc", "desc"):
+                params = {"sort_by": sort_by, "sort_dir": sort_dir}
+                full = client.get("/invoices/list", params=params).json()
+                paged = self.walk(client, 4, **params)
+                assert paged == [item["id"] for item in full], (sort_by, sort_dir)
+                assert len(set(paged)) == 17
+
+    def test_filtered_pages_and_count(self, client, test_session):
+        """Тест: фильтры одинаково применяются к страницам и к счётчику"""
+        self.seed(test_session)
+        params = {"motivated_person": "Петров Пётр", "payment_date_from": "2024-03-02"}
+
+        total = client.get("/invoices/count", params=params).json()["total"]
+        ids = self.walk(client, 3, **params)
+
+        assert total == len(ids) > 0
+        assert client.get("/invoices/count").json() == {"total": 17}
+
+    def test_act_aggregates(self, client, test_session):
+        """Тест: количество и сумма актов считаются в SQL для страницы и контрагента"""
+        self.seed(test_session)
+        page = client.get(
+            "/invoices/list", params={"page_size": 3, "sort_by": "acts_count"}
+        ).json()
+        top = page["items"][0]
+
+        assert (top["number"], top["acts_count"], top["acts_sum"]) == ("N-3", 1, 20)
+        assert top["free_acts_count"] == 1
+        assert page["items"][1]["acts_count"] == 0
+
+        invoices = client.get(
+            "/invoices/list", params={"contractor_id": top["contractor_id"]}
+        ).json()
+        assert {item["free_acts_count"] for item in invoices} == {1}
+        assert sum(item["acts_sum"] for item in invoices) == 20
+
+        response = client.get(f"/contractor/{top['contractor_id']}")
+        assert response.status_code == 200
+        assert "N-3" in response.text
+
+    def test_invalid_cursor(self, client, test_session):
+        """Тест: повреждённый курсор возвращает ошибку"""
+        self.seed(test_session)
+        response = client.get(
+            "/invoices/list", params={"page_size": 5, "cursor": "не курсор"}
+        )
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+
+    @pytest.mark.parametrize(
+        "values", [[{"a": 1}, 1, 2, 3], [0, 1, "2024-13-01", 3], [0, 1, None, "1"]]
+    )
+    def test_cursor_with_wrong_types(self, client, test_session, values):
+        """Тест: курсор со значениями не того типа отклоняется с кодом 400"""
+        self.seed(test_session)
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get(
+            "/invoices/list", params={"page_size": 5, "cursor": cursor}
+        )
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+
+    def test_page_size_is_capped(self, client, test_session):
+        """Тест: размер страницы ограничен сверху"""
+        self.seed(test_session)
+        page = client.get("/invoices/list", params={"page_size": 100000}).json()
+        assert page["page_size"] == 500
+        assert len(page["items"]) == 17
+
+
+class TestActCounters:
+    """Интеграционные тесты для счётчиков актов"""
+
+    def seed(self, test_session):
+        contractor = Contractor(name="Альфа ООО")
+        test_session.add(contractor)
+        test_session.flush()
+        invoices = [
+            Invoice(number=f"N-{i}", amount=1000, contractor_id=contractor.id)
+            for i in range(2)
+        ]
+        acts = [
+            Act(number=f"A-{i}", amount=100 * (i + 1), contractor_id=contractor.id)
+            for i in range(3)
+        ]
+        test_session.add_all(invoices + acts)
+        test_session.commit()
+        repair_counters(test_session)
+        test_session.commit()
+        return contractor, invoices, acts
+
+    def counters(self, test_session, contractor, invoices):
+        test_session.expire_all()
+        return (
+            contractor.free_acts_count,
+            [(inv.acts_count, inv.acts_sum) for inv in invoices],
+        )
+
+    def test_link_update_unlink(self, client, test_session):
+        """Тест: привязка, изменение и отвязка акта обновляют счётчики"""
+        contractor, invoices, acts = self.seed(test_session)
+        first, second = invoices
+
+        client.post(f"/act/link/{acts[0].id}", data={"invoice_id": first.id})
+        client.post(f"/act/link/{acts[1].id}", data={"invoice_id": first.id})
+        assert self.counters(test_session, contractor, invoices) == (
+            1,
+            [(2, 300), (0, 0)],
+        )
+
+        client.post(
+            f"/act/update/{acts[1].id}", data={"invoice_id": second.id, "amount": 250}
+        )
+        assert self.counters(test_session, contractor, invoices) == (
+            1,
+            [(1, 100), (1, 250)],
+        )
+
+        client.post(f"/act/unlink/{acts[0].id}")
+        client.post(f"/act/update/{acts[1].id}", data={"invoice_id": 0})
+        assert self.counters(test_session, contractor, invoices) == (
+            3,
+            [(0, 0), (0, 0)],
+        )
+
+    def test_status_follows_acts(self, client, test_session):
+        """Тест: статус счёта пересчитывается при привязке актов и доступен в фильтре"""
+        _, invoices, acts = self.seed(test_session)
+        first, second = invoices
+
+        client.post(f"/act/link/{acts[2].id}", data={"invoice_id": first.id})
+        test_session.expire_all()
+        assert (first.status, second.status) == ("Частично", "Не оплачен")
+
+        client.post(f"/act/update/{acts[2].id}", data={"amount": 1000})
+        test_session.expire_all()
+        assert first.status == "Оплачен"
+
+        client.post(f"/act/link/{acts[0].id}", data={"invoice_id": first.id})
+        test_session.expire_all()
+        assert first.status == "Ошибка суммы"
+
+        params = {"status": "Ошибка суммы"}
+        listed = client.get("/invoices/list", params=params).json()
+        assert [item["id"] for item in listed] == [first.id]
+        assert client.get("/invoices/count", params=params).json() == {"total": 1}
+
+    def test_delete_act_and_invoice(self, client, test_session):
+        """Тест: удаление акта и счёта обновляет счётчики"""
+        contractor, invoices, acts = self.seed(test_session)
+        first, second = invoices
+        client.post(f"/act/link/{acts[0].id}", data={"invoice_id": first.id})
+        client.post(f"/act/link/{acts[1].id}", data={"invoice_id": second.id})
+
+        client.post(f"/act/delete/{acts[0].id}")
+        assert self.counters(test_session, contractor, invoices) == (
+            1,
+            [(0, 0), (1, 200)],
+        )
+
+        client.post(f"/invoice/delete/{second.id}")
+        test_session.expire_all()
+        assert contractor.free_acts_count == 2
+
+    def test_imports_and_undo(self, client, test_session):
+        """Тест: импорт и отмена импорта актов обновляют счётчики контрагентов"""
+        ok = "Выполнение завершено успешно"
+        rows = [
+            ["Акт", "", ok, 100, datetime(2024, 3, 1), "S-1", "Альфа ООО", "", "a"],
+            ["Акт", "", ok, 200, datetime(2024, 3, 2), "S-2", "Альфа ООО", "", "b"],
+            ["Акт", "", ok, 300, datetime(2024, 3, 3), "S-3", "Бета ООО", "", "c"],
+        ]
+        result = upload(
+            client, "/import-sbis", make_xlsx(REQUIRED_COLUMNS_SBIS, rows)
+        ).json()
+
+        counts = dict(test_session.query(Contractor.name, Contractor.free_acts_count))
+        assert counts == {"альфа ооо": 2, "бета ооо": 1}
+
+        client.post(f"/import/runs/{result['run_id']}/undo")
+        test_session.expire_all()
+        counts = dict(test_session.query(Contractor.name, Contractor.free_acts_count))
+        assert counts == {"альфа ооо": 0, "бета ооо": 0}
+
+
 class TestActsAPI:
     """Интеграционные тесты для API актов"""
 
@@ -179,3 +895,14 @@ class TestActsAPI:
         """Тест: отвязка акта от счёта"""
         response = client.post("/act/unlink/999999")
         assert response.status_code in (200, 302, 303, 404)
+
+
+class TestSessionDependency:
+    """Интеграционные тесты для зависимости get_session"""
+
+    def test_override_is_used(self, client, test_session):
+        """Тест: эндпоинты работают через переопределённую сессию"""
+        client.post("/employees/add", data={"last_name": "Орлов", "first_name": "Олег"})
+        assert test_session.query(Employee).filter_by(last_name="Орлов").count() == 1
+        names = [e["last_name"] for e in client.get("/employees/list").json()]
+        assert names == ["Орлов"]
@@ -0,0 +1,70 @@
+import sys
+from collections import Counter
+
+import pytest
+
+from benchmarks import run
+from benchmarks.generate import GENERATORS, write_csv, write_xlsx
+from benchmarks.run import compare
+from src.importers import detect_kind
+from src.readers import open_rows
+
+
+class TestGenerators:
+    """Тесты для генераторов синтетических выгрузок"""
+
+    @pytest.mark.parametrize("kind", list(GENERATORS))
+    def test_rows_are_deterministic(self, kind):
+        """Тест: одинаковый seed даёт одинаковые строки"""
+        headers, generate = GENERATORS[kind]
+        rows = list(generate(200, seed=3))
+        assert rows == list(generate(200, seed=3))
+        assert rows != list(generate(200, seed=4))
+        assert all(len(row) == len(headers) for row in rows)
+
+    def test_1c_rows_are_realistic(self):
+        """Тест: в выгрузке 1С есть юр. формы, стоп-слова, нули и дубликаты"""
+        rows = list(GENERATORS["1c"][1](2000))
+        keys = Counter((row[1], row[2], row[3]) for row in rows)
+        assert any(count > 1 for count in keys.values())
+        assert any(row[3] == 0 for row in rows)
+        assert any("ООО" in row[4] for row in rows)
+        assert any("удалить" in row[6] for row in rows)
+
+    @pytest.mark.parametrize("kind", list(GENERATORS))
+    @pytest.mark.parametrize(
+        "writer, filename", [(write_xlsx, "data.xlsx"), (write_csv, "data.csv")]
+    )
+    def test_files_are_recognized(self, kind, writer, filename, tmp_path):
+        """Тест: тип сгенерированного файла определяется по заголовкам"""
+        headers, generate = GENERATORS[kind]
+        path = tmp_path / filename
+        writer(path, headers, generate(10))
+        with (
+            open(path, "rb") as fileobj,
+            open_rows(fileobj, filename) as (read_headers, rows),
+        ):
+            assert detect_kind(read_headers) == kind
+            assert len(list(rows)) == 10
+
+
+class TestRunner:
+    """Тесты для сравнения замеров с эталоном"""
+
+    def test_regressions(self):
+        """Тест: падение скорости и рост памяти сверх допуска считаются регрессией"""
+        baseline = {"rows_per_second": 1000, "peak_rss_mb": 100}
+        ok = {"rows_per_second": 800, "peak_rss_mb": 120}
+        slow = {"rows_per_second": 700, "peak_rss_mb": 130}
+        assert compare("s", ok, baseline, 0.25) == []
+        assert len(compare("s", slow, baseline, 0.25)) == 2
+
+    def test_without_peak_rss(self, monkeypatch):
+        """Тест: без resource и psutil память не замеряется и не сравнивается"""
+        monkeypatch.setattr(run, "resource", None)
+        monkeypatch.setitem(sys.modules, "psutil", None)
+        assert run.peak_rss_mb() is None
+
+        measured = {"rows_per_second": 1000, "peak_rss_mb": None}
+        baseline = {"rows_per_second": 1000, "peak_rss_mb": 100}
+        assert compare("s", measured, baseline, 0.25) == []
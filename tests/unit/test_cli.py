@@ -0,0 +1,115 @@
+import json
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy.orm import sessionmaker
+
+from src.batch import run_batch
+from src.cli import main
+from src.database import Employee, Invoice
+from src.importers import REQUIRED_COLUMNS_1C
+
+
+@pytest.fixture
+def session_factory(test_engine, test_session):
+    test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+    test_session.commit()
+    return sessionmaker(bind=test_engine)
+
+
+@pytest.fixture
+def files(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(REQUIRED_COLUMNS_1C)
+    ws.append([1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"])
+    ws.append([2, "15.03.2024", "A-2", 0, "Альфа", "Пётр Петров", "", "Орг"])
+    xlsx = tmp_path / "invoices.xlsx"
+    wb.save(xlsx)
+    csv = tmp_path / "invoices.csv"
+    csv.write_text(
+        ";".join(REQUIRED_COLUMNS_1C)
+        + "\n1;16.03.2024;B-1;500;Бета;Пётр Петров;;Орг\n",
+        encoding="cp1251",
+    )
+    return [str(xlsx), str(csv)]
+
+
+class TestCli:
+    """Тесты для импорта из командной строки"""
+
+    def test_import_1c(self, session_factory, test_session, files, capsys):
+        """Тест: файлы импортируются по очереди с итогом в текстовом виде"""
+        code = main(["import-1c", *files], session_factory=session_factory)
+
+        assert code == 0
+        assert test_session.query(Invoice).count() == 2
+        output = capsys.readouterr().out
+        assert "invoices.xlsx (1c, импорт #1): строк 2, добавлено 1" in output
+        assert "Файлов: 2, с ошибками: 0" in output
+
+    def test_json_summary_with_jobs(self, session_factory, test_session, files, capsys):
+        """Тест: разбор в нескольких процессах и итог в формате JSON"""
+        code = main(
+            ["import", "--jobs", "2", "--dry-run", "--json", *files],
+            session_factory=session_factory,
+        )
+
+        summary = json.loads(capsys.readouterr().out)
+        assert code == 0
+        assert [f["kind"] for f in summary["files"]] == ["1c", "1c"]
+        assert summary["totals"]["1c"]["added"] == 2
+        assert summary["totals"]["1c"]["skipped_zero"] == 1
+        assert test_session.query(Invoice).count() == 0
+
+    def test_failed_file_sets_exit_code(self, session_factory, files, capsys):
+        """Тест: повторный импорт того же файла даёт ненулевой код возврата"""
+        main(["import-1c", files[0]], session_factory=session_factory)
+        code = main(["import-1c", files[0]], session_factory=session_factory)
+
+        assert code == 1
+        assert "Этот файл уже импортирован" in capsys.readouterr().out
+
+    def test_missing_file(self, session_factory):
+        """Тест: несуществующий файл"""
+        with pytest.raises(SystemExit) as exc:
+            main(["import-1c", "missing.xlsx"], session_factory=session_factory)
+        assert exc.value.code == 2
+
+
+class TestBatch:
+    """Тесты для пакетного импорта с разбором в отдельных процессах"""
+
+    def test_progress_counts_rows_across_files(self, session_factory, files):
+        """Тест: прогресс суммирует строки всех файлов пакета"""
+        calls = []
+        with open(files[0], "rb") as first, open(files[1], "rb") as second:
+            result = run_batch(
+                session_factory,
+                [(files[0], first), (files[1], second)],
+                progress=lambda rows, counters: calls.append(rows),
+                kind="1c",
+                workers=1,
+                chunk_size=1,
+            )
+
+        assert [file["rows"] for file in result["files"]] == [2, 1]
+        assert calls == [1, 2, 3]
+
+    def test_corrupt_archive_fails_alone(self, session_factory, test_session, files):
+        """Тест: повреждённый архив не мешает импорту остальных файлов"""
+        with open(files[0], "rb") as good:
+            result = run_batch(
+                session_factory,
+                [("broken.zip", BytesIO(b"not a zip")), (files[0], good)],
+                kind="1c",
+                workers=1,
+            )
+
+        broken, imported = result["files"]
+        assert broken["filename"] == "broken.zip"
+        assert "Не удалось прочитать файл" in broken["error"]
+        assert imported["added"] == 1
+        assert result["files_failed"] == 1
+        assert test_session.query(Invoice).count() == 1
@@ -0,0 +1,82 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from src.coercion import (
+    DATETIME_FORMATS,
+    DateTimeColumn,
+    FastFormat,
+    parse_amount,
+    parse_datetime,
+    parse_datetime_string,
+)
+
+
+class TestParseAmountSeparators:
+    """Тесты для разделителей разрядов в суммах"""
+
+    @pytest.mark.parametrize(
+        "value",
+        ["1 000,50", "1\xa0000,50", "1\u202f000,50", " 1000.50 "],
+    )
+    def test_thousands_separators(self, value):
+        """Тест: пробел, неразрывный и узкий неразрывный пробел"""
+        assert parse_amount(value) == 1000.5
+
+    def test_invalid_amount(self):
+        """Тест: некорректная сумма"""
+        assert parse_amount("1,000,50") is None
+
+
+class TestFastFormat:
+    """Тесты для быстрого разбора даты по известному формату"""
+
+    @pytest.mark.parametrize("fmt", DATETIME_FORMATS)
+    def test_same_as_strptime_chain(self, fmt):
+        """Тест: быстрый разбор совпадает с полным перебором форматов"""
+        rnd = random.Random(fmt)
+        fast = FastFormat(fmt)
+        for _ in range(200):
+            dt = datetime(
+                rnd.randint(1950, 2060),
+                rnd.randint(1, 12),
+                rnd.randint(1, 28),
+                rnd.randint(0, 23),
+                rnd.randint(0, 59),
+                rnd.randint(0, 59),
+            )
+            value = dt.strftime(fmt)
+            assert fast.parse(value) == parse_datetime_string(value)[0]
+
+    def test_short_year(self):
+        """Тест: двузначный год переводится так же, как в strptime"""
+        fast = FastFormat("%d.%m.%y")
+        assert fast.parse("01.02.68").year == 2068
+        assert fast.parse("01.02.69").year == 1969
+
+    def test_unpadded_value_falls_back_to_strptime(self):
+        """Тест: значение без ведущих нулей разбирается через strptime"""
+        assert FastFormat("%d.%m.%Y").parse("5.3.2024") == datetime(2024, 3, 5)
+
+    def test_invalid_date(self):
+        """Тест: несуществующая дата"""
+        assert FastFormat("%d.%m.%Y").parse("31.02.2024") is None
+
+
+class TestDateTimeColumn:
+    """Тесты для определения формата колонки"""
+
+    def test_format_learned_from_sample(self):
+        """Тест: формат колонки определяется по первым строкам"""
+        column = DateTimeColumn(sample_size=3)
+        for day in range(1, 4):
+            column.parse(f"{day:02d}.03.2024 10:30")
+        assert column.fast.fmt == "%d.%m.%Y %H:%M"
+
+    def test_other_formats_still_parsed(self):
+        """Тест: значения другого формата разбираются полным перебором"""
+        column = DateTimeColumn(sample_size=1)
+        column.parse("15.03.2024")
+        for value in ["2024-03-16", "16.03.24 10:30", 45305, None, "", "bad"]:
+            assert column.parse(value) == parse_datetime(value)
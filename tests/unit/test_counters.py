@@ -0,0 +1,51 @@
+from src.counters import refresh_counters, repair_counters
+from src.database import Act, Contractor, Invoice
+
+
+def seed(session):
+    alpha = Contractor(name="Альфа ООО")
+    beta = Contractor(name="Бета ООО")
+    session.add_all([alpha, beta])
+    session.flush()
+    first = Invoice(number="1", amount=300, contractor_id=alpha.id)
+    second = Invoice(number="2", amount=100, contractor_id=beta.id)
+    session.add_all([first, second])
+    session.flush()
+    session.add_all(
+        [
+            Act(number="A-1", amount=100, contractor_id=alpha.id, invoice_id=first.id),
+            Act(number="A-2", amount=50.5, contractor_id=alpha.id, invoice_id=first.id),
+            Act(number="A-3", amount=10, contractor_id=alpha.id),
+            Act(number="A-4", amount=20, contractor_id=alpha.id),
+            Act(number="B-1", amount=30, contractor_id=beta.id),
+        ]
+    )
+    session.commit()
+    return alpha, beta, first, second
+
+
+class TestCounters:
+    """Тесты для счётчиков актов по счетам и контрагентам"""
+
+    def test_repair_recomputes_all(self, test_session):
+        """Тест: ремонт пересчитывает счётчики всех счетов и контрагентов"""
+        alpha, beta, first, second = seed(test_session)
+        assert first.acts_count == 0
+
+        assert repair_counters(test_session) == {"invoices": 2, "contractors": 2}
+        test_session.commit()
+
+        assert (first.acts_count, first.acts_sum) == (2, 150.5)
+        assert (second.acts_count, second.acts_sum) == (0, 0)
+        assert (alpha.free_acts_count, beta.free_acts_count) == (2, 1)
+
+    def test_refresh_only_given_rows(self, test_session):
+        """Тест: точечный пересчёт не трогает остальные строки"""
+        alpha, beta, first, _ = seed(test_session)
+
+        refresh_counters(test_session, invoice_ids=[first.id, None])
+        refresh_counters(test_session, contractor_ids=[beta.id])
+        test_session.commit()
+
+        assert first.acts_count == 2
+        assert (alpha.free_acts_count, beta.free_acts_count) == (0, 1)
@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine, event, text
+
+from src.database import (
+    SQLITE_PRAGMAS,
+    _apply_sqlite_pragmas,
+    get_engine,
+    get_session_factory,
+)
+from src.query_plans import check_query_plans, full_scans
+
+
+class TestEngine:
+    """Тесты для engine и фабрики сессий"""
+
+    def test_engine_is_process_wide(self):
+        """Тест: engine создаётся один раз на процесс"""
+        assert get_engine() is get_engine()
+
+    def test_session_factory_is_cached(self):
+        """Тест: фабрика сессий создаётся один раз"""
+        assert get_session_factory() is get_session_factory()
+        assert get_session_factory().kw["bind"] is get_engine()
+
+    def test_sqlite_pragmas_applied(self, tmp_path):
+        """Тест: PRAGMA применяются при открытии соединения"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+        try:
+            with engine.connect() as conn:
+                journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+                busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+                synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+            assert journal_mode == "wal"
+            assert busy_timeout == dict(SQLITE_PRAGMAS)["busy_timeout"]
+            assert synchronous == 1
+        finally:
+            engine.dispose()
+
+
+class TestQueryPlans:
+    """Тесты для планов выполнения горячих запросов"""
+
+    def test_hot_queries_use_indexes(self, test_session):
+        """Тест: горячие запросы не делают полного сканирования таблиц"""
+        plans = check_query_plans(test_session)
+        assert plans
+        for name, plan in plans.items():
+            assert not full_scans(plan), f"{name}: {plan}"
+
+    def test_duplicate_checks_are_covered(self, test_session):
+        """Тест: проверка дубликатов обходится одним покрывающим индексом"""
+        plans = check_query_plans(test_session)
+        assert "COVERING INDEX" in plans["import_1c_duplicate"][0]
+        assert "COVERING INDEX" in plans["import_sbis_duplicate"][0]
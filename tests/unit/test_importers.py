@@ -0,0 +1,300 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from src.database import Contractor, Employee, ImportReportRow, ImportRun, Invoice
+from src.importers import (
+    ContractorResolver,
+    InvoiceImporter,
+    MAX_KEPT_DRY_RUNS,
+    REQUIRED_COLUMNS_1C,
+    REQUIRED_COLUMNS_SBIS,
+    chunked,
+    detect_kind,
+)
+from src.readers import build_col_map
+
+
+@pytest.fixture
+def statements(test_engine):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(test_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def row_1c(number, day, amount, responsible="Пётр Петров", comment=""):
+    return (1, day, number, amount, "Альфа ООО", responsible, comment, "Орг")
+
+
+class TestChunked:
+    """Тесты для разбиения на пакеты"""
+
+    def test_chunks(self):
+        """Тест: последний пакет может быть неполным"""
+        assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_empty(self):
+        """Тест: пустой источник не даёт пакетов"""
+        assert list(chunked([], 3)) == []
+
+
+class TestDetectKind:
+    """Тесты для определения типа файла по заголовкам"""
+
+    def test_known_kinds(self):
+        """Тест: файлы 1С и СБИС различаются по обязательным колонкам"""
+        assert detect_kind(["№ п/п", *REQUIRED_COLUMNS_1C, "Лишняя"]) == "1c"
+        assert detect_kind([f" {col} " for col in REQUIRED_COLUMNS_SBIS]) == "sbis"
+
+    def test_unknown_kind(self):
+        """Тест: неполный набор колонок"""
+        assert detect_kind(REQUIRED_COLUMNS_1C[:-1]) is None
+        assert detect_kind([]) is None
+
+
+class TestDuplicateDetection:
+    """Тесты для пакетной проверки дубликатов"""
+
+    @pytest.fixture
+    def importer(self, test_session):
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.add(Invoice(number="A-1", date=date(2024, 3, 15), amount=100.0))
+        test_session.commit()
+        return InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C))
+
+    def test_existing_and_in_file_duplicates(self, importer, test_session):
+        """Тест: дубликаты из базы и внутри файла отмечаются одинаково"""
+        result = importer.run(
+            [
+                row_1c("A-1", "15.03.2024", 100),
+                row_1c("A-2", "15.03.2024", 200),
+                row_1c("A-2", "15.03.2024", 200),
+                row_1c("A-2", "16.03.2024", 200),
+            ]
+        )
+        assert result["added"] == 2
+        assert result["skipped_duplicate"] == 2
+        report = test_session.query(ImportReportRow.status).filter_by(
+            run_id=result["run_id"]
+        )
+        assert [status for (status,) in report.order_by("row_number")] == [
+            "Пропущен",
+            "Импортирован",
+            "Пропущен",
+            "Импортирован",
+        ]
+
+    def test_lookup_is_batched(self, importer, statements):
+        """Тест: дубликаты ищутся одним запросом на пакет строк"""
+        rows = [row_1c(f"N-{i}", "15.03.2024", 100 + i) for i in range(50)]
+        importer.run(rows, chunk_size=25)
+        lookups = [s for s in statements if s.startswith("SELECT invoices.number")]
+        assert len(lookups) == 2
+
+
+class TestContractorResolver:
+    """Тесты для пакетного поиска и создания контрагентов"""
+
+    def test_existing_and_new_contractors(self, test_session):
+        """Тест: существующие находятся, недостающие создаются одним пакетом"""
+        existing = Contractor(name="альфа ооо")
+        test_session.add(existing)
+        test_session.commit()
+
+        resolver = ContractorResolver(test_session)
+        resolver.resolve(
+            [("Альфа, ООО", None), ("ООО Бета", "7701"), ("Бета, ООО", "7702")]
+        )
+
+        assert resolver.get_id("Альфа, ООО") == existing.id
+        beta = test_session.query(Contractor).filter_by(name="бета ооо").one()
+        assert resolver.get_id("Бета, ООО") == beta.id
+        assert beta.inn == "7701"
+        assert test_session.query(Contractor).count() == 2
+
+    def test_name_normalized_once(self, test_session, monkeypatch):
+        """Тест: каждое исходное название нормализуется один раз"""
+        calls = []
+        monkeypatch.setattr(
+            "src.importers.normalize_contractor_names",
+            lambda names: calls.extend(names) or [name.lower() for name in names],
+        )
+        resolver = ContractorResolver(test_session)
+        resolver.resolve([("Альфа", None)] * 3)
+        resolver.get_id("Альфа")
+        assert calls == ["Альфа"]
+
+    def test_concurrent_insert_is_ignored(self, test_session, monkeypatch):
+        """Тест: контрагент, созданный параллельным импортом, не дублируется"""
+        test_session.add(Contractor(name="гамма"))
+        test_session.commit()
+        resolver = ContractorResolver(test_session)
+        real_load = resolver.load
+        loads = []
+
+        def stale_load(names):
+            loads.append(names)
+            return {} if len(loads) == 1 else real_load(names)
+
+        monkeypatch.setattr(resolver, "load", stale_load)
+        resolver.resolve([("Гамма", None)])
+
+        assert resolver.get_id("Гамма") is not None
+        assert test_session.query(Contractor).count() == 1
+
+
+class TestBulkInsert:
+    """Тесты для пакетной записи строк"""
+
+    @pytest.fixture
+    def importer(self, test_session, monkeypatch):
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        real_record = InvoiceImporter.record
+
+        def failing_record(self, fields):
+            if fields["number"] == "N-3":
+                raise RuntimeError("write failed")
+            return real_record(self, fields)
+
+        monkeypatch.setattr(InvoiceImporter, "record", failing_record)
+        return InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C))
+
+    def rows(self):
+        return [row_1c(f"N-{i}", "15.03.2024", 100 + i) for i in range(5)]
+
+    def test_atomic_import_rolls_back_everything(self, importer, test_session):
+        """Тест: в режиме «всё или ничего» ошибка отменяет весь импорт"""
+        with pytest.raises(RuntimeError):
+            importer.run(self.rows(), chunk_size=2, atomic=True)
+        test_session.rollback()
+        assert test_session.query(Invoice).count() == 0
+
+    def test_commit_per_chunk_keeps_finished_chunks(self, importer, test_session):
+        """Тест: при фиксации по пакетам сохраняются завершённые пакеты"""
+        with pytest.raises(RuntimeError):
+            importer.run(self.rows(), chunk_size=2, atomic=False)
+        test_session.rollback()
+        assert test_session.query(Invoice).count() == 2
+
+    def test_identity_map_stays_empty(self, test_session):
+        """Тест: строки пишутся без ORM-объектов в сессии"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        importer = InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C))
+        result = importer.run(self.rows(), chunk_size=2)
+        assert result["added"] == 5
+        assert not [
+            o for o in test_session.identity_map.values() if isinstance(o, Invoice)
+        ]
+
+
+class TestDryRun:
+    """Тесты для пробного запуска импорта"""
+
+    @pytest.fixture
+    def importer(self, test_session):
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.add(Invoice(number="N-0", date=date(2024, 3, 15), amount=100.0))
+        test_session.commit()
+        return InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C))
+
+    def rows(self):
+        return [row_1c(f"N-{i}", "15.03.2024", 100 + i) for i in range(4)]
+
+    def test_no_business_writes(self, importer, test_session, statements):
+        """Тест: пробный запуск не пишет счета и контрагентов"""
+        result = importer.run(self.rows(), chunk_size=2, dry_run=True)
+
+        assert result["dry_run"] is True
+        assert result["added"] == 3
+        assert result["skipped_duplicate"] == 1
+        writes = [s for s in statements if s.startswith(("INSERT", "UPDATE"))]
+        assert not [s for s in writes if "invoices" in s or "contractors" in s]
+        assert test_session.query(Invoice).count() == 1
+        assert test_session.query(Contractor).count() == 0
+
+    def test_same_counters_as_real_import(self, importer, test_session):
+        """Тест: счётчики пробного запуска совпадают с реальным импортом"""
+        preview = importer.run(self.rows(), dry_run=True)
+        real = InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C)).run(
+            self.rows()
+        )
+        volatile = ("run_id", "dry_run", "timings")
+        assert {k: v for k, v in preview.items() if k not in volatile} == {
+            k: v for k, v in real.items() if k not in volatile
+        }
+
+    def test_old_dry_runs_pruned(self, importer, test_session):
+        """Тест: хранятся только последние пробные запуски"""
+        run_ids = [
+            InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C)).run(
+                self.rows(), dry_run=True
+            )["run_id"]
+            for _ in range(MAX_KEPT_DRY_RUNS + 2)
+        ]
+        kept = {run_id for (run_id,) in test_session.query(ImportRun.id)}
+        assert kept == set(run_ids[-MAX_KEPT_DRY_RUNS:])
+        reported = {r for (r,) in test_session.query(ImportReportRow.run_id).distinct()}
+        assert reported == kept
+
+
+class TestContentHashes:
+    """Тесты для пропуска уже импортированных строк по хэшу содержимого"""
+
+    @pytest.fixture(autouse=True)
+    def employee(self, test_session):
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+
+    def run(self, session, rows, **options):
+        importer = InvoiceImporter(session, build_col_map(REQUIRED_COLUMNS_1C))
+        return importer.run(rows, **options)
+
+    def rows(self, count):
+        return [row_1c(f"N-{i}", "15.03.2024", 100 + i) for i in range(count)]
+
+    def test_grown_file_imports_only_new_rows(self, test_session):
+        """Тест: при повторной загрузке обрабатываются только новые строки"""
+        self.run(test_session, self.rows(3))
+        result = self.run(test_session, self.rows(5), chunk_size=2)
+
+        assert result["added"] == 2
+        assert result["skipped_known"] == 3
+        assert result["skipped_duplicate"] == 0
+        numbers = test_session.query(ImportReportRow.number).filter_by(
+            run_id=result["run_id"]
+        )
+        assert sorted(n for (n,) in numbers) == ["N-3", "N-4"]
+
+    def test_row_number_not_hashed(self, test_session):
+        """Тест: сдвиг номера п/п не делает строку новой"""
+        self.run(test_session, self.rows(1))
+        shifted = [(99, *self.rows(1)[0][1:])]
+        assert self.run(test_session, shifted)["skipped_known"] == 1
+
+    def test_inserted_hash_recorded(self, test_session):
+        """Тест: у импортированного счёта сохраняется хэш строки"""
+        self.run(test_session, self.rows(1))
+        assert test_session.query(Invoice).one().source_hash
+
+    def test_repeated_row_in_file_is_duplicate(self, test_session):
+        """Тест: повтор строки внутри файла остаётся дубликатом"""
+        rows = self.rows(1) * 2
+        result = self.run(test_session, rows, chunk_size=1)
+        assert result["added"] == 1
+        assert result["skipped_duplicate"] == 1
+        assert result["skipped_known"] == 0
+
+    def test_force_reprocesses_known_rows(self, test_session):
+        """Тест: принудительный импорт заново проверяет все строки"""
+        self.run(test_session, self.rows(2))
+        result = self.run(test_session, self.rows(2), force=True)
+        assert result["skipped_known"] == 0
+        assert result["skipped_duplicate"] == 2
@@ -0,0 +1,105 @@
+import random
+
+from src.database import Employee, StopWord
+from src.matching import (
+    CommentMatcher,
+    KeywordMatcher,
+    get_comment_matcher,
+    invalidate_comment_matchers,
+)
+
+
+class TestKeywordMatcher:
+    """Тесты для многошаблонного поиска"""
+
+    def test_overlapping_patterns(self):
+        """Тест: находятся все вхождения, включая вложенные и перекрывающиеся"""
+        matcher = KeywordMatcher(["тест", "тестовый", "вый", "стов", "нет"])
+        assert matcher.find_all("это тестовый счёт") == [
+            "тест",
+            "тестовый",
+            "вый",
+            "стов",
+        ]
+
+    def test_order_and_duplicates_preserved(self):
+        """Тест: порядок и повторы шаблонов сохраняются"""
+        matcher = KeywordMatcher(["б", "а", "б"])
+        assert matcher.find_all("аб") == ["б", "а", "б"]
+
+    def test_empty_pattern_always_matches(self):
+        """Тест: пустой шаблон совпадает с любой строкой, как оператор in"""
+        assert KeywordMatcher(["", "x"]).find_all("") == [""]
+
+    def test_same_as_substring_search(self):
+        """Тест: результат совпадает с поиском подстрок по каждому слову"""
+        rnd = random.Random(1)
+        patterns = ["".join(rnd.choices("абв", k=rnd.randint(1, 4))) for _ in range(30)]
+        matcher = KeywordMatcher(patterns)
+        for _ in range(200):
+            text = "".join(rnd.choices("абвг ", k=rnd.randint(0, 20)))
+            assert matcher.find_all(text) == [p for p in patterns if p in text]
+
+
+class TestCommentMatcher:
+    """Тесты для поиска стоп-слов и фамилий РПО в комментарии"""
+
+    def test_stop_words_and_surnames(self):
+        """Тест: стоп-слова и фамилии находятся за один проход"""
+        matcher = CommentMatcher(["тест", "удал"], {"петров"})
+        assert matcher.match("тест петрова") == (["тест"], True)
+        assert matcher.match("ок") == ([], False)
+
+    def test_empty_comment_has_no_surname(self):
+        """Тест: пустой комментарий не содержит фамилию даже при пустой фамилии"""
+        assert CommentMatcher([], {""}).match("") == ([], False)
+
+
+class TestMatcherCache:
+    """Тесты для кэша автомата в процессе"""
+
+    def test_matcher_is_reused(self, test_session):
+        """Тест: без изменений автомат не перестраивается"""
+        assert get_comment_matcher(test_session) is get_comment_matcher(test_session)
+
+    def test_stop_word_change_rebuilds(self, test_session):
+        """Тест: добавление стоп-слова сбрасывает кэш"""
+        before = get_comment_matcher(test_session)
+        test_session.add(StopWord(word="Тест"))
+        test_session.commit()
+        after = get_comment_matcher(test_session)
+        assert after is not before
+        assert after.stop_words == ["тест"]
+
+    def test_employee_change_rebuilds(self, test_session):
+        """Тест: изменение сотрудника сбрасывает кэш"""
+        employee = Employee(last_name="Петров", first_name="Пётр")
+        test_session.add(employee)
+        test_session.commit()
+        assert get_comment_matcher(test_session).surnames == {"петров"}
+
+        employee.last_name = "Сидоров"
+        test_session.commit()
+        assert get_comment_matcher(test_session).surnames == {"сидоров"}
+
+    def test_invalidation_during_build(self, test_session, monkeypatch):
+        """Тест: автомат, собранный до сброса кэша, не сохраняется"""
+        real_init = CommentMatcher.__init__
+
+        def init_with_concurrent_commit(self, stop_words, surnames):
+            invalidate_comment_matchers(test_session.get_bind())
+            real_init(self, stop_words, surnames)
+
+        monkeypatch.setattr(CommentMatcher, "__init__", init_with_concurrent_commit)
+        stale = get_comment_matcher(test_session)
+        monkeypatch.setattr(CommentMatcher, "__init__", real_init)
+
+        assert get_comment_matcher(test_session) is not stale
+
+    def test_rollback_keeps_cache(self, test_session):
+        """Тест: отменённые изменения не сбрасывают кэш"""
+        before = get_comment_matcher(test_session)
+        test_session.add(StopWord(word="тест"))
+        test_session.flush()
+        test_session.rollback()
+        assert get_comment_matcher(test_session) is before
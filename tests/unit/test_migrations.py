@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from src.database import Base, SchemaMigration
+from src.migrations import MIGRATIONS, current_version, head_version, upgrade
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def make_legacy_db(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE {SchemaMigration.__tablename__}")
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+
+
+class TestMigrations:
+    """Тесты для версионных миграций схемы"""
+
+    def test_fresh_db_is_stamped_with_head(self, file_engine):
+        """Тест: новая база создаётся сразу с последней версией"""
+        assert upgrade(file_engine) == []
+        with file_engine.connect() as conn:
+            assert current_version(conn) == head_version()
+
+    def test_legacy_db_is_upgraded_in_place(self, file_engine):
+        """Тест: существующая база без версии получает все миграции"""
+        make_legacy_db(file_engine)
+        with file_engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO invoices (number, amount) VALUES ('1', 100.0)"
+            )
+
+        applied = upgrade(file_engine)
+
+        assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+        indexes = {ix["name"] for ix in inspect(file_engine).get_indexes("invoices")}
+        assert "ix_invoices_number_date_amount" in indexes
+        with file_engine.connect() as conn:
+            assert current_version(conn) == head_version()
+            count = conn.exec_driver_sql("SELECT COUNT(*) FROM invoices").scalar()
+        assert count == 1
+
+    def test_act_counters_are_backfilled(self, file_engine):
+        """Тест: миграция счётчиков заполняет их по существующим актам"""
+        make_legacy_db(file_engine)
+        with file_engine.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE invoices DROP COLUMN acts_count")
+            conn.exec_driver_sql("ALTER TABLE invoices DROP COLUMN acts_sum")
+            conn.exec_driver_sql("ALTER TABLE contractors DROP COLUMN free_acts_count")
+            conn.exec_driver_sql("INSERT INTO contractors (id, name) VALUES (1, 'А')")
+            conn.exec_driver_sql(
+                "INSERT INTO invoices (id, number, amount, contractor_id) "
+                "VALUES (1, '1', 100.0, 1)"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO acts (number, amount, contractor_id, invoice_id) "
+                "VALUES ('A', 40.0, 1, 1), ('B', 60.0, 1, 1), ('C', 5.0, 1, NULL)"
+            )
+
+        upgrade(file_engine)
+
+        with file_engine.connect() as conn:
+            invoice = conn.exec_driver_sql(
+                "SELECT acts_count, acts_sum FROM invoices"
+            ).one()
+            free = conn.exec_driver_sql(
+                "SELECT free_acts_count FROM contractors"
+            ).scalar()
+        assert tuple(invoice) == (2, 100.0)
+        assert free == 1
+
+    def test_upgrade_is_idempotent(self, file_engine):
+        """Тест: повторный запуск не применяет миграции повторно"""
+        make_legacy_db(file_engine)
+        upgrade(file_engine)
+        assert upgrade(file_engine) == []
+
+    def test_failed_migration_is_rolled_back(self, file_engine, monkeypatch):
+        """Тест: упавшая миграция не меняет версию схемы"""
+        make_legacy_db(file_engine)
+        first = MIGRATIONS[0]
+
+        def broken(conn):
+            first.upgrade(conn)
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(
+            "src.migrations.MIGRATIONS",
+            [first._replace(upgrade=broken), *MIGRATIONS[1:]],
+        )
+        with pytest.raises(RuntimeError):
+            upgrade(file_engine)
+
+        with file_engine.connect() as conn:
+            assert current_version(conn) == 0
+        indexes = {ix["name"] for ix in inspect(file_engine).get_indexes("invoices")}
+        assert "ix_invoices_number_date_amount" not in indexes
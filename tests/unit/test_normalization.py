@@ -0,0 +1,40 @@
+from src.main import templates
+from src.normalization import (
+    capitalize_contractor_name,
+    normalization_cache_info,
+    normalize_contractor_name,
+    normalize_contractor_names,
+)
+
+
+class TestCapitalizeContractorName:
+    """Тесты для форматирования имени контрагента в шаблонах"""
+
+    def test_order_kept(self):
+        """Тест: слова капитализируются без перестановки юридической формы"""
+        assert capitalize_contractor_name("ооо технодрайв") == "ООО Технодрайв"
+
+    def test_template_global(self):
+        """Тест: шаблоны используют форматирование без перестановки"""
+        func = templates.env.globals["format_contractor_name"]
+        assert func("ип иванов") == "ИП Иванов"
+
+
+class TestNormalizeContractorNames:
+    """Тесты для пакетной нормализации и кэша"""
+
+    def test_batch_same_as_single(self):
+        """Тест: пакетная нормализация совпадает с поштучной"""
+        names = ["Альфа, ООО", "ООО Альфа", "Бета (Склад)", "Альфа, ООО", ""]
+        assert normalize_contractor_names(names) == [
+            normalize_contractor_name(name) for name in names
+        ]
+
+    def test_cache_counters(self):
+        """Тест: повторное имя берётся из кэша"""
+        normalize_contractor_name.cache_clear()
+        normalize_contractor_names(["Гамма АО", "Гамма АО", "Дельта"])
+        normalize_contractor_name("Гамма АО")
+        info = normalization_cache_info()["normalize_contractor_name"]
+        assert info["misses"] == 2
+        assert info["hits"] == 1
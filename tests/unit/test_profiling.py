@@ -0,0 +1,125 @@
+import json
+import logging
+import pstats
+
+from sqlalchemy import text
+
+from src import profiling
+from src.database import Employee
+from src.importers import REQUIRED_COLUMNS_1C, InvoiceImporter
+from src.profiling import (
+    StageTimer,
+    configure_import_logging,
+    import_logger,
+    log_import,
+    maybe_profile,
+)
+from src.readers import build_col_map
+
+
+class TestStageTimer:
+    """Тесты для замеров этапов импорта"""
+
+    def test_stages_accumulate(self, test_engine):
+        """Тест: повторные замеры этапа суммируются, запросы считаются"""
+        with StageTimer(test_engine) as timer:
+            for _ in range(2):
+                with timer.stage("query", rows=5), test_engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            with timer.stage("idle") as stats:
+                stats["rows"] += 3
+
+        result = timer.to_dict()
+        assert result["queries"] == 2
+        assert result["stages"]["query"]["rows"] == 10
+        assert result["stages"]["query"]["queries"] == 2
+        assert result["stages"]["idle"]["rows"] == 3
+        assert result["stages"]["idle"]["queries"] == 0
+
+    def test_listener_removed(self, test_engine):
+        """Тест: после замера запросы больше не считаются"""
+        with StageTimer(test_engine) as timer:
+            pass
+        with test_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert timer.queries == 0
+
+    def test_profile_dump(self, tmp_path, monkeypatch):
+        """Тест: профиль cProfile сохраняется только по флагу"""
+        monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+        with maybe_profile(False, "off") as profiler:
+            assert profiler is None
+        with maybe_profile(True, "on") as profiler:
+            sum(range(1000))
+        assert pstats.Stats(profiler["path"]).total_calls > 0
+
+
+class TestImportTimings:
+    """Тесты для замеров в результате импорта"""
+
+    def rows(self):
+        return [
+            (1, "15.03.2024", "A-1", 1000, "Альфа", "Пётр Петров", "", "Орг"),
+            (2, "15.03.2024", "A-2", 0, "Альфа", "Пётр Петров", "", "Орг"),
+        ]
+
+    def test_timings_returned_and_logged(self, test_session, caplog):
+        """Тест: замеры этапов возвращаются, сохраняются и пишутся в журнал"""
+        test_session.add(Employee(last_name="Петров", first_name="Пётр"))
+        test_session.commit()
+        importer = InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C))
+        with caplog.at_level(logging.INFO, logger="invoice_act.import"):
+            result = importer.run(self.rows())
+
+        stages = result["timings"]["stages"]
+        assert stages["read"]["rows"] == 2
+        assert stages["classify"]["rows"] == 2
+        assert stages["insert"]["rows"] == 1
+        assert stages["duplicates"]["queries"] == 1
+        assert result["timings"]["queries"] >= 4
+        assert "profile_path" not in result
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record["event"] == "import_finished"
+        assert record["run_id"] == result["run_id"]
+        assert record["timings"] == result["timings"]
+
+    def test_profile_flag(self, test_session, tmp_path, monkeypatch):
+        """Тест: по флагу profile сохраняется дамп pstats"""
+        monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+        importer = InvoiceImporter(test_session, build_col_map(REQUIRED_COLUMNS_1C))
+        result = importer.run(self.rows(), profile=True)
+
+        assert result["profile_path"] == str(
+            tmp_path / f"import_{result['run_id']}.pstats"
+        )
+        assert pstats.Stats(result["profile_path"]).total_calls > 0
+
+
+class TestImportLogging:
+    """Тесты для настройки журнала импорта"""
+
+    def test_records_written_to_stderr(self, capfd, monkeypatch):
+        """Тест: после настройки запись уровня INFO попадает в stderr"""
+        monkeypatch.setattr(import_logger, "handlers", [])
+        monkeypatch.setattr(import_logger, "propagate", False)
+        level = import_logger.level
+        try:
+            import_logger.setLevel(logging.NOTSET)
+            log_import({"event": "before"})
+            assert capfd.readouterr().err == ""
+
+            configure_import_logging()
+            configure_import_logging()
+            log_import({"event": "import_finished", "run_id": 7})
+        finally:
+            import_logger.setLevel(level)
+
+        lines = capfd.readouterr().err.splitlines()
+        assert len(lines) == 1
+        assert '{"event": "import_finished", "run_id": 7}' in lines[0]
+        assert len(import_logger.handlers) == 1
+
+    def test_configured_on_startup(self, client):
+        """Тест: приложение включает журнал импорта при запуске"""
+        assert import_logger.getEffectiveLevel() == logging.INFO
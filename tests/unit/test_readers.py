@@ -0,0 +1,184 @@
+import asyncio
+from datetime import date, datetime
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+from openpyxl import Workbook
+
+from src.readers import (
+    OpenpyxlReader,
+    detect_delimiter,
+    detect_encoding,
+    get_xlsx_reader,
+    load_spooled_rows,
+    open_rows,
+    open_xlsx_rows,
+    spool_rows,
+    spool_upload,
+)
+
+CSV_TEXT = (
+    "№ п/п;Дата;Номер;Сумма;Контрагент\n"
+    '1;15.03.2024;A-1;1 000,50;"Альфа, ООО"\n'
+    '2;16.03.2024;A-2;;"Бета\nООО"\n'
+)
+EXPECTED_HEADERS = ["№ п/п", "Дата", "Номер", "Сумма", "Контрагент"]
+EXPECTED_ROWS = [
+    ("1", "15.03.2024", "A-1", "1 000,50", "Альфа, ООО"),
+    ("2", "16.03.2024", "A-2", None, "Бета\nООО"),
+]
+
+
+def read(data: bytes, filename: str):
+    with open_rows(BytesIO(data), filename) as (headers, rows):
+        return list(headers), list(rows)
+
+
+class TestCsvReader:
+    """Тесты для чтения CSV и TSV"""
+
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "cp1251"])
+    def test_encodings(self, encoding):
+        """Тест: кодировка файла определяется автоматически"""
+        assert read(CSV_TEXT.encode(encoding), "import.csv") == (
+            EXPECTED_HEADERS,
+            EXPECTED_ROWS,
+        )
+
+    @pytest.mark.parametrize("delimiter", [";", ",", "\t"])
+    def test_delimiters(self, delimiter):
+        """Тест: разделитель колонок определяется по содержимому"""
+        text = CSV_TEXT.replace(";", delimiter)
+        if delimiter == ",":
+            text = text.replace("1 000,50", '"1 000,50"')
+        assert read(text.encode(), "import.txt") == (EXPECTED_HEADERS, EXPECTED_ROWS)
+
+    def test_tsv_single_column(self):
+        """Тест: для TSV без разделителей в образце по умолчанию берётся табуляция"""
+        assert read("Номер\nA-1\n".encode(), "import.tsv") == (["Номер"], [("A-1",)])
+
+    def test_blank_lines_skipped(self):
+        """Тест: пустые строки и строки из одних разделителей пропускаются"""
+        text = CSV_TEXT.replace("\n1;", "\n\n;;;;\n1;", 1) + "\n"
+        assert read(text.encode(), "import.csv") == (EXPECTED_HEADERS, EXPECTED_ROWS)
+
+    def test_rows_fit_header_width(self):
+        """Тест: короткие строки дополняются, длинные обрезаются по заголовку"""
+        text = "№ п/п;Дата;Номер;Сумма;Контрагент\n1;15.03.2024;A-1\n2;;;;Бета;лишнее\n"
+        assert read(text.encode(), "import.csv")[1] == [
+            ("1", "15.03.2024", "A-1", None, None),
+            ("2", None, None, None, "Бета"),
+        ]
+
+    def test_detect_encoding_ignores_cut_character(self):
+        """Тест: обрезанный на границе образца символ не меняет кодировку"""
+        assert detect_encoding("Альфа".encode()[:-1]) == "utf-8"
+        assert detect_encoding("Альфа".encode("cp1251")) == "cp1251"
+
+    def test_detect_delimiter_ignores_cut_line(self):
+        """Тест: последняя неполная строка образца не учитывается"""
+        assert detect_delimiter("a;b;c\n1;2;3\n4;5") == ";"
+
+    def test_same_rows_as_xlsx(self):
+        """Тест: строки CSV совпадают со строками XLSX с текстовыми ячейками"""
+        wb = Workbook()
+        ws = wb.active
+        ws.append(EXPECTED_HEADERS)
+        for row in EXPECTED_ROWS:
+            ws.append(row)
+        buffer = BytesIO()
+        wb.save(buffer)
+        assert read(buffer.getvalue(), "import.xlsx") == read(
+            CSV_TEXT.encode(), "import.csv"
+        )
+
+
+class TestSpoolUpload:
+    """Тесты для сохранения загруженного файла во временный файл"""
+
+    @pytest.mark.parametrize("reader", ["openpyxl", "calamine"])
+    def test_xlsx_upload_is_readable(self, reader):
+        """Тест: сохранённую загрузку XLSX читает каждая библиотека"""
+        if reader == "calamine":
+            pytest.importorskip("python_calamine")
+        wb = Workbook()
+        wb.active.append(["Номер"])
+        wb.active.append(["A-1"])
+        buffer = BytesIO()
+        wb.save(buffer)
+        buffer.seek(0)
+
+        fileobj, _ = asyncio.run(spool_upload(UploadFile(buffer, filename="a.xlsx")))
+        with fileobj, open_xlsx_rows(fileobj, reader) as (headers, rows):
+            assert tuple(headers) == ("Номер",)
+            assert [tuple(row) for row in rows] == [("A-1",)]
+
+
+class TestSpooledRows:
+    """Тесты для передачи строк из процесса разбора частями"""
+
+    def test_round_trip(self, tmp_path):
+        """Тест: строки записываются частями и читаются обратно по одной"""
+        path = tmp_path / "import.csv"
+        path.write_bytes(CSV_TEXT.encode())
+
+        headers, spool_path, total = spool_rows(str(path), chunk_size=1)
+
+        assert headers == EXPECTED_HEADERS
+        assert total == 2
+        assert list(load_spooled_rows(spool_path)) == EXPECTED_ROWS
+
+
+class TestXlsxReaders:
+    """Тесты для выбора библиотеки чтения XLSX"""
+
+    def workbook(self) -> bytes:
+        wb = Workbook()
+        ws = wb.active
+        ws["B2"] = "Номер"
+        ws["C2"] = "Дата"
+        ws["D2"] = "Сумма"
+        ws.append([None, "A-1", datetime(2024, 3, 15, 10, 30), 1000])
+        ws.append([None, "A-2", date(2024, 3, 16), 10.5])
+        ws.append([None, None, "", None, "лишнее"])
+        buffer = BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+
+    def read(self, reader: str):
+        with open_xlsx_rows(BytesIO(self.workbook()), reader) as (headers, rows):
+            return tuple(headers), [tuple(row) for row in rows]
+
+    def test_explicit_reader(self, monkeypatch):
+        """Тест: библиотека выбирается по имени или переменной окружения"""
+        assert isinstance(get_xlsx_reader("openpyxl"), OpenpyxlReader)
+        monkeypatch.setenv("XLSX_READER", "openpyxl")
+        assert isinstance(get_xlsx_reader(), OpenpyxlReader)
+
+    def test_unknown_reader(self):
+        """Тест: неизвестная библиотека"""
+        with pytest.raises(ValueError):
+            get_xlsx_reader("unknown")
+
+    def test_calamine_same_rows(self):
+        """Тест: calamine отдаёт те же строки, что и openpyxl"""
+        pytest.importorskip("python_calamine")
+        assert self.read("calamine") == self.read("openpyxl")
+
+    @pytest.mark.parametrize("reader", ["openpyxl", "calamine"])
+    def test_active_sheet(self, reader):
+        """Тест: обе библиотеки читают активный лист книги"""
+        if reader == "calamine":
+            pytest.importorskip("python_calamine")
+        wb = Workbook()
+        wb.active.append(["Первый"])
+        wb.create_sheet("Второй").append(["Номер"])
+        wb["Второй"].append(["A-1"])
+        wb.active = 1
+        buffer = BytesIO()
+        wb.save(buffer)
+        buffer.seek(0)
+        with open_xlsx_rows(buffer, reader) as (headers, rows):
+            assert tuple(headers) == ("Номер",)
+            assert [tuple(row) for row in rows] == [("A-1",)]
@@ -0,0 +1,143 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+
+from restore_database import restore_backup
+from src.database import Base
+from src.migrations import head_version
+
+BASELINE_SCHEMA = (
+    (
+        "CREATE TABLE contractors (id INTEGER PRIMARY KEY, created_at DATETIME, "
+        "name TEXT UNIQUE, inn TEXT)"
+    ),
+    (
+        "CREATE TABLE employees (id INTEGER PRIMARY KEY, created_at DATETIME, "
+        "last_name TEXT, first_name TEXT, middle_name TEXT, department TEXT, "
+        "position TEXT)"
+    ),
+    (
+        "CREATE TABLE stop_words (id INTEGER PRIMARY KEY, created_at DATETIME, "
+        "word TEXT UNIQUE)"
+    ),
+    (
+        "CREATE TABLE invoices (id INTEGER PRIMARY KEY, created_at DATETIME, "
+        "number TEXT, date DATE, amount FLOAT, contractor_id INTEGER, "
+        "organization_group TEXT, responsible_import TEXT, comment TEXT, "
+        "deadline DATE, deadline_days INTEGER, payment_date DATE, "
+        "motivated_person TEXT, status TEXT)"
+    ),
+    (
+        "CREATE TABLE acts (id INTEGER PRIMARY KEY, created_at DATETIME, "
+        "number TEXT, filename TEXT, signing_date DATETIME, amount FLOAT, "
+        "contractor_id INTEGER, invoice_id INTEGER, responsible_manager TEXT)"
+    ),
+)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    backup_path = str(tmp_path / "backup.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    execute(backup_path, *BASELINE_SCHEMA)
+    return db_path, backup_path
+
+
+def execute(path, *statements):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        results = []
+        for sql in statements:
+            result = conn.exec_driver_sql(sql)
+            results.append(result.fetchall() if result.returns_rows else None)
+    engine.dispose()
+    return results
+
+
+def fill_backup(backup_path):
+    execute(
+        backup_path,
+        "INSERT INTO contractors (id, name) VALUES (1, 'альфа')",
+        "INSERT INTO invoices (id, number, amount, contractor_id, status) "
+        "VALUES (1, '1', 100.0, 1, 'Не оплачен')",
+        "INSERT INTO acts (number, amount, contractor_id, invoice_id) "
+        "VALUES ('A', 100.0, 1, 1), ('B', 5.0, 1, NULL)",
+    )
+
+
+class TestRestore:
+    """Тесты для восстановления базы из резервной копии"""
+
+    def test_old_backup_is_restored(self, paths):
+        """Тест: бекап со старой схемой восстанавливается со счётчиками"""
+        db_path, backup_path = paths
+        fill_backup(backup_path)
+        execute(db_path, "INSERT INTO contractors (id, name) VALUES (7, 'бета')")
+
+        restore_backup(backup_path, db_path, 1, 1)
+
+        contractors, invoices = execute(
+            db_path,
+            "SELECT id, name, free_acts_count FROM contractors",
+            "SELECT acts_count, acts_sum, status FROM invoices",
+        )
+        assert [tuple(row) for row in contractors] == [(1, "альфа", 1)]
+        assert [tuple(row) for row in invoices] == [(1, 100.0, "Оплачен")]
+
+    def test_both_databases_are_migrated(self, tmp_path):
+        """Тест: бекап и база с исходной схемой обновляются до восстановления"""
+        db_path = str(tmp_path / "database.db")
+        backup_path = str(tmp_path / "backup.db")
+        execute(db_path, *BASELINE_SCHEMA)
+        execute(backup_path, *BASELINE_SCHEMA)
+        fill_backup(backup_path)
+
+        restore_backup(backup_path, db_path, 1, 1)
+
+        versions, invoices = execute(
+            db_path,
+            "SELECT MAX(version) FROM schema_migrations",
+            "SELECT acts_count, source_hash, import_run_id FROM invoices",
+        )
+        assert versions[0][0] == head_version()
+        assert [tuple(row) for row in invoices] == [(1, None, None)]
+
+    def test_import_runs_are_replaced(self, paths):
+        """Тест: журнал импортов берётся из бекапа, а не остаётся от текущей базы"""
+        db_path, backup_path = paths
+        fill_backup(backup_path)
+        execute(
+            db_path,
+            "INSERT INTO import_runs (id, kind, file_hash) VALUES (5, '1c', 'abc')",
+            "INSERT INTO import_report_rows (run_id, status) VALUES (5, 'Добавлен')",
+        )
+
+        restore_backup(backup_path, db_path, 1, 1)
+
+        runs, rows = execute(
+            db_path,
+            "SELECT COUNT(*) FROM import_runs",
+            "SELECT COUNT(*) FROM import_report_rows",
+        )
+        assert runs[0][0] == 0
+        assert rows[0][0] == 0
+
+    def test_failed_restore_keeps_data(self, paths):
+        """Тест: при ошибке восстановления текущие данные не удаляются"""
+        db_path, backup_path = paths
+        fill_backup(backup_path)
+        execute(backup_path, "INSERT INTO employees (id, last_name) VALUES (1, 'А')")
+        execute(
+            db_path,
+            "INSERT INTO contractors (id, name) VALUES (7, 'бета')",
+            "INSERT INTO employees (id, last_name) VALUES (1, 'Б')",
+        )
+
+        with pytest.raises(IntegrityError):
+            restore_backup(backup_path, db_path, 2, 1)
+
+        (contractors,) = execute(db_path, "SELECT name FROM contractors")
+        assert [row[0] for row in contractors] == ["бета"]
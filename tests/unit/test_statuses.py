@@ -0,0 +1,35 @@
+from src.database import Invoice
+from src.statuses import (
+    STATUS_OVERPAID,
+    STATUS_PAID,
+    STATUS_PARTIAL,
+    STATUS_UNPAID,
+    refresh_statuses,
+)
+
+
+class TestStatuses:
+    """Тесты для пересчёта статусов счетов"""
+
+    def test_refresh_by_acts_sum(self, test_session):
+        """Тест: статус определяется суммой актов с допуском"""
+        cases = [
+            (100, 0, STATUS_UNPAID),
+            (100, 40, STATUS_PARTIAL),
+            (100, 100, STATUS_PAID),
+            (100.1, 0.1 + 0.2 + 99.8, STATUS_PAID),
+            (100, 100.01, STATUS_OVERPAID),
+            (0, 0, STATUS_UNPAID),
+        ]
+        invoices = [
+            Invoice(number=str(i), amount=amount, acts_sum=acts_sum)
+            for i, (amount, acts_sum, _) in enumerate(cases)
+        ]
+        test_session.add_all(invoices)
+        test_session.commit()
+
+        assert refresh_statuses(test_session) == 4
+        test_session.commit()
+
+        assert [inv.status for inv in invoices] == [status for *_, status in cases]
+        assert refresh_statuses(test_session) == 0